@@ -0,0 +1,160 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, request, abort, jsonify, stream_with_context
+from werkzeug.exceptions import HTTPException
+
+import database
+import feed
+import serializers
+from extensions import db
+from models import Venue, Artist, Show, genre_members
+from queries import (DETAIL_SHOWS_PER_PAGE, encode_cursor, decode_cursor, search_results, show_listing,
+  entity_with_shows, more_shows, split_shows, next_shows_cursor)
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_BATCH = 1000
+
+VENUE_FIELDS = ['id', 'name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'website_link',
+  'facebook_link', 'seeking_talent', 'seeking_description', 'timezone', 'past_count', 'future_count', 'updated_at']
+ARTIST_FIELDS = ['id', 'name', 'city', 'state', 'phone', 'genres', 'image_link', 'website_link',
+  'facebook_link', 'seeking_venue', 'seeking_description', 'past_count', 'future_count', 'updated_at']
+SHOW_FIELDS = ['id', 'start_time', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link']
+
+def api_fields(allowed):
+  # sparse fieldsets: ?fields=id,name
+  if not request.args.get('fields'):
+    return allowed
+  fields = [field for field in request.args['fields'].split(',') if field]
+  unknown = [field for field in fields if field not in allowed]
+  if unknown:
+    abort(400, 'Unknown fields: ' + ', '.join(unknown))
+  return fields
+
+def api_limit():
+  # ?limit=all streams the whole collection through a server-side cursor
+  if request.args.get('limit') == 'all':
+    return None
+  limit = request.args.get('limit', API_PAGE_SIZE, type=int)
+  return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+def api_cursor(*types):
+  cursor = request.args.get('after')
+  after = decode_cursor(cursor, *types)
+  if cursor and after is None:
+    abort(400, 'Invalid cursor')
+  return after
+
+def api_stream(query, fields, limit, cursor_of):
+  def rows():
+    # the view's session is removed at teardown, before the body streams;
+    # rebinding runs the query on the streaming context's session, which is
+    # removed (and its connection returned) when the stream ends
+    bound = query.with_session(db.session())
+    yield from bound.limit(limit + 1) if limit is not None else bound.yield_per(API_STREAM_BATCH)
+  return Response(stream_with_context(serializers.stream_page(rows(), fields, limit, cursor_of)),
+    mimetype='application/json')
+
+def api_entities(model, allowed):
+  fields = api_fields(allowed)
+  after = api_cursor(int)
+  # only the requested columns are selected, plus the id the cursor needs
+  query = db.session.query(*[getattr(model, field) for field in ['id'] + [f for f in fields if f != 'id']])
+  if after:
+    query = query.filter(model.id > after[0])
+  if request.args.get('genre'):
+    query = query.filter(model.id.in_(genre_members(model, request.args['genre'])))
+  return api_stream(query.order_by(model.id), fields, api_limit(), lambda row: encode_cursor(row.id))
+
+def api_entity(model, allowed, entity_id, other, other_fk, show_fk, prefix):
+  now = datetime.now()
+  entity, rows = entity_with_shows(model, other, other_fk, show_fk, entity_id, now)
+  if entity is None:
+    abort(404)
+  data = serializers.pick(entity, api_fields(allowed))
+  past_shows, upcoming_shows = split_shows(rows, now)
+  data.update({
+    "upcoming_shows": api_show_items(upcoming_shows, prefix),
+    "past_shows": api_show_items(past_shows, prefix),
+    "next_upcoming_shows": next_shows_cursor(upcoming_shows),
+    "next_past_shows": next_shows_cursor(past_shows)
+  })
+  return Response(serializers.dumps(data), mimetype='application/json')
+
+def api_entity_shows(entity_id, other, other_fk, show_fk, prefix):
+  when = request.args.get('when', 'past')
+  after = api_cursor(datetime.fromisoformat, int)
+  if after is None:
+    abort(400, 'Missing cursor')
+  rows = more_shows(other, other_fk, show_fk, entity_id, when, after)
+  return Response(serializers.dumps({"data": api_show_items(rows, prefix), "next": next_shows_cursor(rows)}),
+    mimetype='application/json')
+
+def api_show_items(rows, prefix):
+  return [{
+    "id": row.id,
+    "start_time": row.start_time,
+    prefix + "_id": row.other_id,
+    prefix + "_name": row.other_name,
+    prefix + "_image_link": row.other_image_link
+  } for row in rows[:DETAIL_SHOWS_PER_PAGE]]
+
+@bp.route('/venues')
+def api_venues():
+  return api_entities(Venue, VENUE_FIELDS)
+
+@bp.route('/venues/<int:venue_id>')
+def api_venue(venue_id):
+  return api_entity(Venue, VENUE_FIELDS, venue_id, Artist, Show.artist_id, Show.venue_id, 'artist')
+
+@bp.route('/venues/<int:venue_id>/shows')
+def api_venue_shows(venue_id):
+  return api_entity_shows(venue_id, Artist, Show.artist_id, Show.venue_id, 'artist')
+
+@bp.route('/artists')
+def api_artists():
+  return api_entities(Artist, ARTIST_FIELDS)
+
+@bp.route('/artists/<int:artist_id>')
+def api_artist(artist_id):
+  return api_entity(Artist, ARTIST_FIELDS, artist_id, Venue, Show.venue_id, Show.artist_id, 'venue')
+
+@bp.route('/artists/<int:artist_id>/shows')
+def api_artist_shows(artist_id):
+  return api_entity_shows(artist_id, Venue, Show.venue_id, Show.artist_id, 'venue')
+
+@bp.route('/shows')
+def api_shows():
+  # newest first, same keyset order as /shows
+  fields = api_fields(SHOW_FIELDS)
+  after = api_cursor(datetime.fromisoformat, int)
+  return api_stream(show_listing(None, after, limit=None), fields, api_limit(),
+    lambda row: encode_cursor(row.start_time, row.id))
+
+@bp.route('/shows/upcoming')
+def api_upcoming_shows():
+  # the upcoming shows feed, soonest first: ?range=week|month&city=&state=
+  window = request.args.get('range', 'week')
+  if window not in feed.FEED_RANGES:
+    abort(400, 'range must be one of: ' + ', '.join(sorted(feed.FEED_RANGES)))
+  fields = api_fields(feed.FEED_COLUMNS)
+  after = api_cursor(datetime.fromisoformat, int)
+  query = feed.upcoming_feed(feed.FEED_RANGES[window], request.args.get('city'), request.args.get('state'), after)
+  return api_stream(query, fields, api_limit(), lambda row: encode_cursor(row.start_time, row.show_id))
+
+@bp.route('/search/<any(venues, artists):kind>')
+def api_search(kind):
+  page = max(request.args.get('page', 1, type=int), 1)
+  return jsonify(search_results(Venue if kind == 'venues' else Artist, request.args.get('q', ''), page,
+    request.args.get('genre')))
+
+@bp.before_request
+def api_read_only():
+  # the API only reads
+  database.route_reads()
+
+@bp.errorhandler(HTTPException)
+def api_error(error):
+  return jsonify({"error": error.name, "message": error.description}), error.code
@@ -0,0 +1,182 @@
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+from sqlalchemy.exc import SQLAlchemyError
+
+import feed
+from cache import conditional
+from database import read_only
+from extensions import db, page_cache
+from models import Venue, Artist, Show
+from queries import (decode_cursor, artist_pages, touch_artist_venues, detail_validator, listing_validator,
+  search_results, artist_listing, entity_with_shows, more_shows, split_shows, show_tiles, next_shows_cursor)
+
+bp = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+@bp.route('/artists')
+@read_only
+@conditional(lambda: listing_validator('artists', artist_listing(request.args.get('genre')), Artist.updated_at))
+@page_cache.cached(lambda: 'artists')
+def artists():
+  # FINISHED: replace with real data returned from querying the database
+  genre = request.args.get('genre')
+  return render_template('pages/artists.html', artists=artist_listing(genre).all(), genre=genre)
+
+@bp.route('/artists/search', methods=['POST'])
+@read_only
+def search_artists():
+  # FINISHED: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term=request.form.get('search_term', '')
+  page = max(request.form.get('page', 1, type=int), 1)
+  genre = request.form.get('genre')
+  response = search_results(Artist, search_term, page, genre)
+  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''),
+    genre=genre)
+
+@bp.route('/artists/<int:artist_id>')
+@read_only
+@conditional(lambda artist_id: detail_validator(Artist, artist_id))
+@page_cache.cached(lambda artist_id: 'artist:%d' % artist_id)
+def show_artist(artist_id):
+  # shows the venue page with the given venue_id
+  # FINISHED: replace with real venue data from the venues table, using venue_id
+  now = datetime.now()
+  artist, rows = entity_with_shows(Artist, Venue, Show.venue_id, Show.artist_id, artist_id, now)
+  if artist is None:
+    abort(404)
+  past_shows, upcoming_shows = split_shows(rows, now)
+  data = {
+    'id': artist.id,
+    "name": artist.name,
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "image_link": artist.image_link,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "genres": artist.genres,
+    "website_link": artist.website_link,
+    "upcoming_shows": show_tiles(upcoming_shows, 'venue'),
+    "past_shows": show_tiles(past_shows, 'venue'),
+    "more_upcoming_shows": next_shows_cursor(upcoming_shows),
+    "more_past_shows": next_shows_cursor(past_shows),
+    "past_shows_count": artist.past_count,
+    "upcoming_shows_count": artist.future_count
+  }
+  return render_template('pages/show_artist.html', artist=data)
+
+@bp.route('/artists/<int:artist_id>/shows')
+@read_only
+def artist_shows(artist_id):
+  # "load more" for an artist page: the next page of past or upcoming shows
+  when = request.args.get('when', 'past')
+  after = decode_cursor(request.args.get('after'), datetime.fromisoformat, int)
+  if after is None:
+    abort(400)
+  rows = more_shows(Venue, Show.venue_id, Show.artist_id, artist_id, when, after)
+  return render_template('pages/show_artist_tiles.html', artist_id=artist_id, when=when,
+    shows=show_tiles(rows, 'venue'), more=next_shows_cursor(rows))
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm()
+  artist = Artist.query.get_or_404(artist_id)
+  data={
+    "id": artist.id,
+    "name": artist.name,
+    "genres": artist.genres,
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "website_link": artist.website_link,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "image_link": artist.image_link
+  }
+  # FINISHED: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=data)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  artist = Artist.query.get_or_404(artist_id)
+  name = artist.name
+  try:
+    artist.name = request.form['name']
+    artist.city = request.form['city']
+    artist.state = request.form['state']
+    artist.phone = request.form['phone']
+    artist.genres = request.form.getlist('genres')
+    artist.facebook_link = request.form['facebook_link']
+    artist.website_link = request.form['website_link']
+    artist.seeking_description = request.form['seeking_description']
+    artist.image_link = request.form['image_link']
+    artist.seeking_venue = request.form.get('seeking_venue')
+    if (artist.seeking_venue == 'y'):
+      setattr(artist, 'seeking_venue', True)
+    else:
+      setattr(artist, 'seeking_venue', False)
+    touch_artist_venues(artist_id)
+    feed.update_artist(artist)
+    db.session.commit()
+  except (KeyError, SQLAlchemyError):
+    db.session.rollback()
+    flash('An error occured. Artist ' + name + ' could not be updated.')
+  else:
+    page_cache.invalidate(*artist_pages(artist_id))
+    flash('Artist ' + request.form['name'] + ' was successfully updated!')
+  # FINISHED: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # FINISHED: insert form data as a new Artist record in the db, instead
+  # FINISHED: modify data to be the data object returned from db insertion
+  try:
+    artist = Artist(
+      name=request.form['name'], 
+      city=request.form['city'], 
+      state=request.form['state'],
+      phone=request.form['phone'], 
+      genres=request.form.getlist('genres'), 
+      facebook_link=request.form['facebook_link'], 
+      image_link=request.form['image_link'],
+      seeking_venue=request.form.get('seeking_venue'), 
+      seeking_description=request.form['seeking_description'], 
+      website_link=request.form['website_link'])
+    if (artist.seeking_venue == 'y'):
+      artist.seeking_venue = True
+    else:
+      artist.seeking_venue = False
+    db.session.add(artist)
+    db.session.commit()
+  except (KeyError, SQLAlchemyError):
+    # FINISHED: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    db.session.rollback()
+    flash('An error occured. Artist ' + request.form.get('name', '') + ' could not be listed.')
+  else:
+    page_cache.invalidate('artists')
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  return render_template('pages/home.html')
+
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy.engine import make_url
+
+import database
+import profiler
+
+# Concurrent reads (DATABASE_ASYNC): views whose queries do not depend on
+# each other -- an entity and its shows, a search's count and its page --
+# hand them to run(), which starts them together on SQLAlchemy's asyncio
+# engine (asyncpg, or aiosqlite) and waits once, for the slowest, instead of
+# once per query. The workers stay WSGI: Flask runs an async view in a new
+# event loop per request, which no connection pool survives, so each worker
+# process keeps one event loop thread with the async engines and their pools.
+# Each query gets its own connection, from the primary or the request's
+# replica. With the setting off, for a single query or for in-memory SQLite,
+# run() executes them in turn on db.session, with the same results.
+
+ASYNC_DRIVERS = {'postgresql': ('postgresql+asyncpg', 'asyncpg'), 'sqlite': ('sqlite+aiosqlite', 'aiosqlite')}
+
+
+def async_uri(uri):
+    url = make_url(uri)
+    if url.get_backend_name() not in ASYNC_DRIVERS:
+        raise ValueError('DATABASE_ASYNC does not support %r databases' % url.get_backend_name())
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()][0])
+
+
+def async_engine_options(config, uri):
+    # database.engine_options for the async engine, which brings its own
+    # (unmetered) queue pool and passes settings to asyncpg its own way
+    options = database.engine_options(config, uri)
+    options.pop('poolclass', None)
+    if 'connect_args' in options:
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(config['DATABASE_STATEMENT_TIMEOUT'])}}
+    return options
+
+
+async def fetch(engine, statement):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    # the result is buffered, and loaded entities keep their attributes once
+    # the session closes
+    async with AsyncSession(engine) as session:
+        return await session.execute(statement)
+
+
+async def fetch_all(engine, statements):
+    return await asyncio.gather(*[fetch(engine, statement) for statement in statements])
+
+
+class AsyncEngines(object):
+    # one app's async engines, keyed like db.engines, created in each process
+    # on first use; a forked worker leaves its parent's behind
+
+    def __init__(self, config):
+        uris = {None: config['SQLALCHEMY_DATABASE_URI']}
+        uris.update(zip(database.replica_keys(config), config.get('DATABASE_REPLICA_URIS') or ()))
+        self.options = {key: (async_uri(uri), async_engine_options(config, uri)) for key, uri in uris.items()}
+        self.lock = threading.Lock()
+        self.engines = {}
+        self.pid = None
+
+    def engine(self, key):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        with self.lock:
+            if self.pid != os.getpid():
+                self.engines, self.pid = {}, os.getpid()
+            if key not in self.engines:
+                uri, options = self.options[key]
+                self.engines[key] = create_async_engine(uri, **options)
+                if current_app.extensions['profiler'].enabled:
+                    profiler.instrument(self.engines[key].sync_engine)
+            return self.engines[key]
+
+
+class AsyncDatabase(object):
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.loop = None
+        self.pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        engines = None
+        if app.config.get('DATABASE_ASYNC') and not database.in_memory(app.config['SQLALCHEMY_DATABASE_URI']):
+            engines = AsyncEngines(app.config)
+            for uri, options in engines.options.values():
+                driver = ASYNC_DRIVERS[uri.get_backend_name()][1]
+                try:
+                    __import__(driver)
+                except ImportError:
+                    raise RuntimeError('DATABASE_ASYNC requires the %s package' % driver)
+        app.extensions['async_db'] = engines
+
+    def event_loop(self):
+        # one loop thread per process, started on first use
+        with self.lock:
+            if self.pid != os.getpid():
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name='asyncdb', daemon=True).start()
+                self.pid = os.getpid()
+            return self.loop
+
+    def run(self, *queries):
+        # the Result of each query (an ORM query or a statement), in order
+        statements = [getattr(query, 'statement', query) for query in queries]
+        engines = current_app.extensions.get('async_db')
+        sqlalchemy = current_app.extensions['sqlalchemy']
+        if engines is None or len(statements) < 2:
+            return [sqlalchemy.session.execute(statement) for statement in statements]
+        engine = engines.engine(database.request_replica(sqlalchemy.engines))
+        # the tasks run in a copy of this thread's context, so the profiler
+        # still sees the request
+        return asyncio.run_coroutine_threadsafe(fetch_all(engine, statements), self.event_loop()).result()
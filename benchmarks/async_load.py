@@ -0,0 +1,114 @@
+"""Throughput and latency with and without DATABASE_ASYNC.
+
+Serves the app twice from a threaded WSGI server, as a worker with --threads
+would, first with the queries of each page run in turn and then with
+DATABASE_ASYNC on, and sends the same requests to each from --users
+concurrent clients: venue and artist pages, their API entities and API
+searches, the views whose independent queries run together. For each mode
+the requests per second and the 50th, 95th and 99th percentile latencies are
+printed. Both runs read the seeded benchmark database (BENCH_DATABASE_URL,
+see benchmarks/conftest.py) with the page cache off; the async run needs
+aiosqlite, or asyncpg for PostgreSQL.
+
+    python -m benchmarks.async_load [--users 16] [--requests 2000] [--database URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import create_app
+from extensions import db
+from models import Venue, Artist
+
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(ROOT, 'benchmarks', 'fyyur-bench.db')
+SEARCH_TERMS = ['a', 'the', 'hall', 'band', 'blue', 'jazz']
+MODES = [('sync', False), ('async', True)]
+
+
+def request_paths(app, count, seed=1):
+    # the same mix for both modes: detail pages, API entities and searches
+    with app.app_context():
+        venue_ids = [venue_id for venue_id, in db.session.query(Venue.id)]
+        artist_ids = [artist_id for artist_id, in db.session.query(Artist.id)]
+        db.session.remove()
+    if not venue_ids or not artist_ids:
+        sys.exit('No venues or artists in the database; run benchmarks.generate first.')
+    chooser = random.Random(seed)
+    kinds = [
+        lambda: '/venues/%d' % chooser.choice(venue_ids),
+        lambda: '/artists/%d' % chooser.choice(artist_ids),
+        lambda: '/api/v1/venues/%d' % chooser.choice(venue_ids),
+        lambda: '/api/v1/artists/%d' % chooser.choice(artist_ids),
+        lambda: '/api/v1/search/%s?q=%s' % (chooser.choice(['venues', 'artists']), chooser.choice(SEARCH_TERMS)),
+    ]
+    return [chooser.choice(kinds)() for _ in range(count)]
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def fetch(base, path):
+    started = time.perf_counter()
+    with urllib.request.urlopen(base + path) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def load(app, paths, users):
+    # serves the app until every path has been fetched; returns the elapsed
+    # seconds and each request's latency
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = 'http://127.0.0.1:%d' % server.server_port
+    try:
+        with ThreadPoolExecutor(users) as clients:
+            list(clients.map(lambda path: fetch(base, path), paths[:users]))
+            started = time.perf_counter()
+            latencies = list(clients.map(lambda path: fetch(base, path), paths))
+            elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        thread.join()
+    return elapsed, latencies
+
+
+def percentile(latencies, share):
+    return statistics.quantiles(latencies, n=100)[share - 1] * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per mode')
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE))
+    args = parser.parse_args(argv)
+    paths = None
+    print('%-6s %10s %9s %9s %9s' % ('mode', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for name, concurrent in MODES:
+        app = create_app('testing', migrations=False, SQLALCHEMY_DATABASE_URI=args.database, CACHE_BACKEND='null',
+                         DATABASE_ASYNC=concurrent)
+        paths = paths or request_paths(app, args.requests)
+        elapsed, latencies = load(app, paths, args.users)
+        print('%-6s %10.1f %9.1f %9.1f %9.1f' % (name, len(paths) / elapsed, percentile(latencies, 50),
+                                                 percentile(latencies, 95), percentile(latencies, 99)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
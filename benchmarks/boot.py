@@ -0,0 +1,101 @@
+"""Worker boot time, measured in fresh interpreters.
+
+Each run starts a new Python process, as a server does for each worker, and
+times the steps of wsgi.py plus the first request:
+
+* import  - `import app`: Flask, SQLAlchemy and the modules app.py needs
+* create  - create_app(migrations=False): extensions, blueprints, models,
+            and the template warm-up when TEMPLATE_WARMUP is on
+* request - the first GET /, which renders the home page (no queries)
+
+The medians are printed with the total, and the exit status is 1 when the
+total goes over the budget (--budget or BOOT_BUDGET_MS, in milliseconds).
+With --imports N the packages taking longest to import in one
+`-X importtime` run are listed as well, each with the time spent in all of
+its modules.
+
+    python -m benchmarks.boot [--runs 7] [--budget 1000] [--config production] [--imports 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 1000
+
+STEPS = ['import', 'create', 'request']
+
+WORKER = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app(sys.argv[1] or None, migrations=False)
+created = time.perf_counter()
+response = application.test_client().get('/')
+response.close()
+requested = time.perf_counter()
+print(json.dumps({"import": imported - started, "create": created - imported, "request": requested - created,
+                  "status": response.status_code, "modules": len(sys.modules)}))
+'''
+
+
+def boot(config=None, flags=()):
+    # one worker boot in a new interpreter; returns its timings in seconds
+    result = subprocess.run([sys.executable, *flags, '-c', WORKER, config or ''], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def measure(runs=7, config=None):
+    # median milliseconds per step over `runs` boots, plus their total
+    samples = [boot(config)[0] for _ in range(runs)]
+    medians = {step: statistics.median(sample[step] for sample in samples) * 1000 for step in STEPS}
+    medians['total'] = sum(medians[step] for step in STEPS)
+    medians['modules'] = samples[-1]['modules']
+    return medians
+
+
+def slowest_imports(count, config=None):
+    # milliseconds per top-level package: the self times of its modules
+    # summed, so a package is not charged for the other packages it imports
+    _, stderr = boot(config, flags=('-X', 'importtime'))
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1000
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget', type=float, default=float(os.environ.get('BOOT_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='milliseconds for import + create + first request')
+    parser.add_argument('--config', help='environment name, defaults to FYYUR_ENV')
+    parser.add_argument('--imports', type=int, default=0, metavar='N', help='list the N slowest packages to import')
+    args = parser.parse_args(argv)
+    medians = measure(args.runs, args.config)
+    for step in STEPS:
+        print('%-8s %8.1f ms' % (step, medians[step]))
+    print('%-8s %8.1f ms  (budget %.0f ms, %d modules loaded)' % ('total', medians['total'], args.budget,
+                                                                  medians['modules']))
+    if args.imports:
+        print()
+        for name, elapsed in slowest_imports(args.imports, args.config):
+            print('%-24s %8.1f ms' % (name, elapsed))
+    if medians['total'] > args.budget:
+        print('Worker boot is over budget by %.1f ms.' % (medians['total'] - args.budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Fixtures for the pytest-benchmark suite.
+
+The suite runs against BENCH_DATABASE_URL (a SQLite file next to this module
+by default, or a local PostgreSQL database) and never touches DATABASE_URL.
+An empty database is seeded with benchmarks.generate first; BENCH_RESEED=1
+rebuilds it, and BENCH_VENUES / BENCH_ARTISTS / BENCH_SHOWS set its size.
+The page cache is off unless CACHE_BACKEND says otherwise, so every request
+runs its queries and renders its template.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(ROOT, 'benchmarks', 'fyyur-bench.db')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from datetime import datetime
+
+import conflicts
+from app import create_app
+from extensions import db
+from models import Venue, Artist, Show, UpcomingShow, Tombstone, GENRE_ASSOCIATIONS
+from queries import encode_cursor, reconcile_counters, venue_order
+from feed import refresh_feed
+from benchmarks.generate import generate
+
+
+def size(name, default):
+    return int(os.environ.get(name, default))
+
+
+@pytest.fixture(scope='session')
+def database_url():
+    return os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE)
+
+
+@pytest.fixture(scope='session')
+def app(database_url):
+    fyyur = create_app('testing', migrations=False, SQLALCHEMY_DATABASE_URI=database_url,
+                       CACHE_BACKEND=os.environ.get('CACHE_BACKEND', 'null'))
+    with fyyur.app_context():
+        db.create_all()
+        try:
+            empty = db.session.query(Show.id, Show.end_time).first() is None
+        except DBAPIError:
+            # seeded before a schema change: rebuild it
+            empty = True
+        db.session.remove()
+    if empty or os.environ.get('BENCH_RESEED') == '1':
+        generate(fyyur, size('BENCH_VENUES', 2000), size('BENCH_ARTISTS', 5000), size('BENCH_SHOWS', 200000),
+                 seed=size('BENCH_SEED', 1), reset=True)
+    with fyyur.app_context():
+        # as the periodic `flask feed refresh` would, since the seed was written
+        refresh_feed()
+        db.session.remove()
+    return fyyur
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def async_client(app, database_url):
+    # the same database with DATABASE_ASYNC on; skipped without its driver
+    pytest.importorskip('asyncpg' if database_url.startswith('postgres') else 'aiosqlite')
+    fyyur = create_app('testing', migrations=False, SQLALCHEMY_DATABASE_URI=database_url,
+                       CACHE_BACKEND=os.environ.get('CACHE_BACKEND', 'null'), DATABASE_ASYNC=True)
+    return fyyur.test_client()
+
+
+@pytest.fixture
+def request_context(app):
+    # queries run inside a request, as they do in the views
+    with app.test_request_context():
+        yield
+        db.session.remove()
+
+
+def busiest_and_median(model):
+    ids = [entity_id for entity_id, in db.session.query(model.id).
+           order_by((model.past_count + model.future_count).desc(), model.id)]
+    return {'busiest': ids[0], 'median': ids[len(ids) // 2]}
+
+
+@pytest.fixture(scope='session')
+def samples(app):
+    # ids and cursors the benchmarks reuse: the busiest and a median venue and
+    # artist, a cursor halfway through the show listing and the newest show
+    with app.app_context():
+        now = datetime.now()
+        middle = db.session.query(Show.start_time, Show.id).\
+            order_by(Show.start_time.desc(), Show.id.desc()).offset(Show.query.count() // 2).first()
+        venue = db.session.query(*venue_order()).order_by(*venue_order()).offset(Venue.query.count() // 2).first()
+        data = {
+            'venue': busiest_and_median(Venue),
+            'artist': busiest_and_median(Artist),
+            'now': now,
+            'now_cursor': encode_cursor(now, 0),
+            'show_middle': tuple(middle),
+            'show_cursor': encode_cursor(*middle),
+            'venue_middle': tuple(venue),
+            'venue_cursor': encode_cursor(*venue),
+        }
+        db.session.remove()
+    return data
+
+
+@pytest.fixture(scope='session')
+def written(app):
+    # rows the write benchmarks create are deleted again, with the tombstones
+    # of those they delete, and the counters rebuilt, once the session ends
+    with app.app_context():
+        last = {model: db.session.query(db.func.max(model.id)).scalar() or 0
+                for model in (Show, Venue, Artist, Tombstone)}
+        db.session.remove()
+    yield
+    with app.app_context():
+        Show.query.filter(Show.id > last[Show]).delete(synchronize_session=False)
+        UpcomingShow.query.filter(UpcomingShow.show_id > last[Show]).delete(synchronize_session=False)
+        Tombstone.query.filter(Tombstone.id > last[Tombstone]).delete(synchronize_session=False)
+        for model, (association, key) in GENRE_ASSOCIATIONS.items():
+            db.session.execute(association.delete().where(association.c[key] > last[model]))
+            model.query.filter(model.id > last[model]).delete(synchronize_session=False)
+        db.session.commit()
+        conflicts.forget()
+        reconcile_counters()
+        db.session.remove()
@@ -0,0 +1,190 @@
+"""Synthetic Fyyur catalogue with a realistic skew.
+
+Seeds N venues, M artists and K shows into the configured database through
+the bulk import writers, so counters, search text and genre links are
+maintained as in production. Popularity follows a Zipf-like curve (a few
+venues and artists get most of the shows), cities follow a long tail, and
+shows spread over the last sixteen years and the next eight, evenings only,
+without two shows at once at a venue or for an artist. The same --seed
+always produces the same catalogue.
+
+    python -m benchmarks.generate --venues 2000 --artists 5000 --shows 200000 [--seed 1] [--reset]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import partitions
+from choices import GENRES
+from app import create_app
+from bulk import entity_record, insert_entities, VENUE_COLUMNS, ARTIST_COLUMNS
+from extensions import db, page_cache
+from models import Venue, Artist
+from scheduling import insert_shows, SHOW_DURATION
+
+BATCH_SIZE = 5000
+
+# shows start in one of these (hour, minute) slots, which SHOW_DURATION
+# apart never overlap, within HISTORY_DAYS before and FUTURE_DAYS after now
+SLOTS = [(17, 0), (19, 30), (22, 0)]
+HISTORY_DAYS = 16 * 365
+FUTURE_DAYS = 8 * 365
+SLOT_DRAWS = 20
+
+CITIES = [
+    ('New York', 'NY', 'America/New_York'), ('Los Angeles', 'CA', 'America/Los_Angeles'),
+    ('Chicago', 'IL', 'America/Chicago'), ('San Francisco', 'CA', 'America/Los_Angeles'),
+    ('Austin', 'TX', 'America/Chicago'), ('Nashville', 'TN', 'America/Chicago'),
+    ('Seattle', 'WA', 'America/Los_Angeles'), ('New Orleans', 'LA', 'America/Chicago'),
+    ('Atlanta', 'GA', 'America/New_York'), ('Boston', 'MA', 'America/New_York'),
+    ('Denver', 'CO', 'America/Denver'), ('Portland', 'OR', 'America/Los_Angeles'),
+    ('Philadelphia', 'PA', 'America/New_York'), ('Detroit', 'MI', 'America/Detroit'),
+    ('Minneapolis', 'MN', 'America/Chicago'), ('Miami', 'FL', 'America/New_York'),
+    ('Las Vegas', 'NV', 'America/Los_Angeles'), ('Memphis', 'TN', 'America/Chicago'),
+    ('Kansas City', 'MO', 'America/Chicago'), ('Salt Lake City', 'UT', 'America/Denver'),
+    ('Baltimore', 'MD', 'America/New_York'), ('Charlotte', 'NC', 'America/New_York'),
+    ('Columbus', 'OH', 'America/New_York'), ('Richmond', 'VA', 'America/New_York'),
+    ('Milwaukee', 'WI', 'America/Chicago'), ('Omaha', 'NE', 'America/Chicago'),
+    ('Boise', 'ID', 'America/Boise'), ('Burlington', 'VT', 'America/New_York'),
+    ('Providence', 'RI', 'America/New_York'), ('Anchorage', 'AK', 'America/Anchorage'),
+]
+
+ADJECTIVES = ['Blue', 'Velvet', 'Golden', 'Rusty', 'Electric', 'Silver', 'Midnight', 'Crimson',
+              'Hidden', 'Wild', 'Lucky', 'Neon', 'Broken', 'Gilded', 'Quiet', 'Rolling']
+VENUE_NOUNS = ['Room', 'Hall', 'Lounge', 'Tavern', 'Garden', 'Ballroom', 'Cellar', 'Theatre',
+               'Warehouse', 'Club', 'Stage', 'Hop', 'Den', 'Saloon']
+ARTIST_NOUNS = ['Foxes', 'Sax Band', 'Petals', 'Echoes', 'Rivers', 'Ghosts', 'Machines',
+                'Strangers', 'Sparrows', 'Kings', 'Tides', 'Wolves', 'Lanterns', 'Orchestra']
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def pick_genres(rng):
+    return rng.sample(GENRES, rng.choice([1, 1, 2, 2, 3]))
+
+
+def phone(rng):
+    return '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999))
+
+
+def venue_rows(rng, count):
+    cities = rng.choices(CITIES, weights=zipf_weights(len(CITIES)), k=count)
+    for number, (city, state, timezone) in enumerate(cities, 1):
+        name = 'The %s %s %d' % (rng.choice(ADJECTIVES), rng.choice(VENUE_NOUNS), number)
+        yield entity_record({
+            'name': name,
+            'city': city,
+            'state': state,
+            'address': '%d %s St' % (rng.randint(1, 9999), rng.choice(ADJECTIVES)),
+            'phone': phone(rng),
+            'genres': pick_genres(rng),
+            'image_link': 'https://images.example.com/venues/%d.jpg' % number,
+            'facebook_link': 'https://www.facebook.com/venue%d' % number,
+            'website_link': 'https://venue%d.example.com' % number,
+            'seeking_talent': rng.random() < 0.3,
+            'seeking_description': 'Looking for local acts' if rng.random() < 0.3 else '',
+            'timezone': timezone,
+        }, VENUE_COLUMNS)
+
+
+def artist_rows(rng, count):
+    cities = rng.choices(CITIES, weights=zipf_weights(len(CITIES)), k=count)
+    for number, (city, state, _) in enumerate(cities, 1):
+        name = '%s %s %d' % (rng.choice(ADJECTIVES), rng.choice(ARTIST_NOUNS), number)
+        yield entity_record({
+            'name': name,
+            'city': city,
+            'state': state,
+            'phone': phone(rng),
+            'genres': pick_genres(rng),
+            'image_link': 'https://images.example.com/artists/%d.jpg' % number,
+            'facebook_link': 'https://www.facebook.com/artist%d' % number,
+            'website_link': 'https://artist%d.example.com' % number,
+            'seeking_venue': rng.random() < 0.3,
+            'seeking_description': 'Touring this season' if rng.random() < 0.3 else '',
+        }, ARTIST_COLUMNS)
+
+
+def show_rows(rng, count, venue_ids, artist_ids, now):
+    # popularity is assigned to shuffled ids, so the busiest venue is not
+    # always the first one inserted. Shows take one of the evening slots, and
+    # a slot already taken at the venue or by the artist is drawn again (the
+    # write path refuses overlapping shows); a show that finds no free slot
+    # is left out
+    venue_ids, artist_ids = list(venue_ids), list(artist_ids)
+    rng.shuffle(venue_ids)
+    rng.shuffle(artist_ids)
+    venues = rng.choices(venue_ids, weights=zipf_weights(len(venue_ids), 0.8), k=count)
+    artists = rng.choices(artist_ids, weights=zipf_weights(len(artist_ids), 0.8), k=count)
+    booked = set()
+    for venue_id, artist_id in zip(venues, artists):
+        for _ in range(SLOT_DRAWS):
+            day, slot = now.date() + timedelta(days=rng.randint(-HISTORY_DAYS, FUTURE_DAYS)), rng.choice(SLOTS)
+            if ('venue', venue_id, day, slot) not in booked and ('artist', artist_id, day, slot) not in booked:
+                break
+        else:
+            continue
+        booked.update({('venue', venue_id, day, slot), ('artist', artist_id, day, slot)})
+        start_time = datetime(day.year, day.month, day.day, *slot)
+        yield {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time,
+               'end_time': start_time + SHOW_DURATION, 'updated_at': now}
+
+
+def batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write(label, writer, rows):
+    started, written = time.perf_counter(), 0
+    for batch in batches(rows):
+        refused = writer(batch)
+        written += len(batch) - len(refused)
+    print('%-8s %8d rows in %.1fs' % (label, written, time.perf_counter() - started))
+
+
+def generate(app, venues, artists, shows, seed=1, reset=False):
+    rng = random.Random(seed)
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        db.create_all()
+        write('venues', insert_entities(Venue), venue_rows(rng, venues))
+        write('artists', insert_entities(Artist), artist_rows(rng, artists))
+        venue_ids = [venue_id for venue_id, in db.session.query(Venue.id).order_by(Venue.id)]
+        artist_ids = [artist_id for artist_id, in db.session.query(Artist.id).order_by(Artist.id)]
+        now = datetime.now().replace(microsecond=0)
+        if shows and venue_ids and artist_ids:
+            write('shows', insert_shows, show_rows(rng, shows, venue_ids, artist_ids, now))
+        if partitions.partitioned():
+            # the monthly layout `flask partitions maintain` keeps
+            started = time.perf_counter()
+            months = partitions.split_months(
+                partitions.add_months(partitions.month_start(now), partitions.AHEAD_MONTHS + 1), now)
+            db.session.commit()
+            print('%-8s %8d months in %.1fs' % ('split', len(months), time.perf_counter() - started))
+        page_cache.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args(argv)
+    generate(create_app(migrations=False), args.venues, args.artists, args.shows, args.seed, args.reset)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Query plans and timings for genre-filtered venue and artist queries.
+
+Runs the first page of the venue listing, the artist listing and a search
+count filtered by the rarest and the most common genre, once through the
+VenueGenre/ArtistGenre association indexes and once with the old predicate
+on the genres array, which has to scan every row. PostgreSQL only; nothing
+is written.
+
+    python -m benchmarks.genre_filter [iterations]
+"""
+import sys
+import time
+
+from sqlalchemy import func
+
+from app import create_app
+from extensions import db
+from models import Venue, Artist, Genre, venue_genres
+from queries import venue_listing, venue_order, artist_listing, VENUES_PER_PAGE
+import search
+
+from benchmarks.show_indexes import explain
+
+
+def array_venue_listing(genre):
+    return db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, Venue.future_count).\
+        filter(Venue.genres.any(genre)).\
+        order_by(*venue_order()).limit(VENUES_PER_PAGE + 1)
+
+
+def array_artist_listing(genre):
+    return Artist.query.filter(Artist.genres.any(genre)).order_by(Artist.name)
+
+
+def search_count(genre, by_array):
+    hits = search.matching(Venue, 'a', 'postgresql')
+    query = db.session.query(func.count()).select_from(hits).join(Venue, Venue.id == hits.c.id)
+    if by_array:
+        return query.filter(Venue.genres.any(genre))
+    return query.filter(Venue.id.in_(db.session.query(venue_genres.c.venue_id).
+                                     join(Genre, Genre.id == venue_genres.c.genre_id).filter(Genre.name == genre)))
+
+
+def queries(genre):
+    return {
+        'venue listing / association': venue_listing(None, genre),
+        'venue listing / array': array_venue_listing(genre),
+        'artist listing / association': artist_listing(genre),
+        'artist listing / array': array_artist_listing(genre),
+        'venue search count / association': search_count(genre, False),
+        'venue search count / array': search_count(genre, True),
+    }
+
+
+def timing(query, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        query.all()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main(iterations=20):
+    with create_app(migrations=False).app_context():
+        if db.engine.dialect.name != 'postgresql':
+            sys.exit('The genre filter benchmark needs PostgreSQL.')
+        counts = db.session.query(Genre.name, func.count(venue_genres.c.venue_id)).\
+            outerjoin(venue_genres, venue_genres.c.genre_id == Genre.id).\
+            group_by(Genre.name).order_by(func.count(venue_genres.c.venue_id)).all()
+        if not counts or counts[-1][1] == 0:
+            sys.exit('No genre-tagged venues in the database, nothing to benchmark.')
+        print('Venues: %d, artists: %d' % (Venue.query.count(), Artist.query.count()))
+        counts = [row for row in counts if row[1]]
+        for genre, tagged in (counts[0], counts[-1]):
+            print('=' * 78)
+            print('genre %r (%d venues)' % (genre, tagged))
+            print('=' * 78)
+            for name, query in queries(genre).items():
+                print('-- %s: %.2f ms/query over %d runs' % (name, timing(query, iterations), iterations))
+                print(explain(query))
+                print()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,104 @@
+"""HTTP load profile for a running Fyyur server.
+
+A visitor mostly browses listings, detail pages and the upcoming shows
+feed, sometimes searches, pages through shows or uses the API, and rarely
+writes. Ids are fetched
+from the API once per simulated user, so any seeded database works (see
+benchmarks.generate).
+
+    locust -f benchmarks/locustfile.py --host http://localhost:5000
+    locust -f benchmarks/locustfile.py --host http://localhost:5000 --headless -u 50 -r 10 -t 2m \\
+        --csv benchmarks/load
+"""
+import random
+
+from locust import HttpUser, between, task
+
+SEARCH_TERMS = ['a', 'the', 'hall', 'band', 'blue', 'jazz', 'new york', 'velvet']
+GENRES = ['Jazz', 'Rock n Roll', 'Folk', 'Blues', 'Classical']
+CITIES = [('New York', 'NY'), ('Chicago', 'IL'), ('Austin', 'TX'), ('Boise', 'ID')]
+
+
+class Visitor(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.venue_ids = self.ids('/api/v1/venues?fields=id&limit=1000')
+        self.artist_ids = self.ids('/api/v1/artists?fields=id&limit=1000')
+
+    def ids(self, url):
+        with self.client.get(url, name=url.split('?')[0], catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure('could not list ids')
+                return []
+            return [row['id'] for row in response.json()['data']]
+
+    @task(10)
+    def venues(self):
+        self.client.get('/venues')
+
+    @task(3)
+    def venues_by_genre(self):
+        self.client.get('/venues?genre=' + random.choice(GENRES), name='/venues?genre=')
+
+    @task(20)
+    def show_venue(self):
+        if self.venue_ids:
+            self.client.get('/venues/%d' % random.choice(self.venue_ids), name='/venues/<id>')
+
+    @task(8)
+    def artists(self):
+        self.client.get('/artists')
+
+    @task(20)
+    def show_artist(self):
+        if self.artist_ids:
+            self.client.get('/artists/%d' % random.choice(self.artist_ids), name='/artists/<id>')
+
+    @task(10)
+    def shows(self):
+        response = self.client.get('/shows')
+        # follow the "older" link a couple of pages deep now and then
+        for _ in range(random.choice([0, 0, 1, 2])):
+            marker = 'href="/shows?after='
+            start = response.text.find(marker)
+            if start < 0:
+                break
+            cursor = response.text[start + len(marker):response.text.index('"', start + len(marker))]
+            response = self.client.get('/shows?after=' + cursor, name='/shows?after=')
+
+    @task(15)
+    def upcoming(self):
+        # the feed, everywhere or in one city
+        window = random.choice(['week', 'month'])
+        if random.random() < 0.5:
+            self.client.get('/shows/upcoming?range=' + window, name='/shows/upcoming')
+        else:
+            city, state = random.choice(CITIES)
+            self.client.get('/shows/upcoming', params={'range': window, 'city': city, 'state': state},
+                            name='/shows/upcoming?city=')
+
+    @task(6)
+    def search(self):
+        kind = random.choice(['venues', 'artists'])
+        self.client.post('/%s/search' % kind, data={'search_term': random.choice(SEARCH_TERMS)},
+                         name='/%s/search' % kind)
+
+    @task(6)
+    def api(self):
+        kind = random.choice(['venues', 'artists', 'shows'])
+        self.client.get('/api/v1/%s?limit=100' % kind, name='/api/v1/%s' % kind)
+
+    @task(1)
+    def edit_venue(self):
+        # re-saves a venue with its own values, so the data set does not drift
+        if not self.venue_ids:
+            return
+        venue_id = random.choice(self.venue_ids)
+        venue = self.client.get('/api/v1/venues/%d' % venue_id, name='/api/v1/venues/<id>').json()
+        form = {field: venue[field] or '' for field in ('name', 'city', 'state', 'address', 'phone', 'image_link',
+                                                         'facebook_link', 'website_link', 'seeking_description')}
+        form['genres'] = venue['genres']
+        if venue['seeking_talent']:
+            form['seeking_talent'] = 'y'
+        self.client.post('/venues/%d/edit' % venue_id, data=form, name='/venues/<id>/edit')
@@ -0,0 +1,77 @@
+"""Query plans and timings for the venue/artist detail page queries.
+
+Runs the show_venue and show_artist show query against the busiest venue
+and artist in the configured database, first with the Show indexes in place
+and then with them dropped inside a transaction that is rolled back, so the
+schema is left untouched. PostgreSQL only; point it at a development copy
+since DROP INDEX holds an exclusive lock on Show until the rollback.
+
+    python -m benchmarks.show_indexes [iterations]
+"""
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+from app import create_app
+from extensions import db
+from models import Venue, Artist, Show
+from queries import detail_shows
+
+INDEXES = ['ix_Show_venue_id_start_time', 'ix_Show_artist_id_start_time', 'ix_Show_start_time']
+
+
+def detail_queries(venue_id, artist_id):
+    now = datetime.now()
+    return {
+        'show_venue': detail_shows(Artist, Show.artist_id, Show.venue_id, venue_id, now),
+        'show_artist': detail_shows(Venue, Show.venue_id, Show.artist_id, artist_id, now),
+    }
+
+
+def explain(query):
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text('EXPLAIN (ANALYZE, BUFFERS) ' + str(statement)))
+    return '\n'.join(row[0] for row in rows)
+
+
+def timing(query, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        query.all()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def report(label, queries, iterations):
+    print('=' * 78)
+    print(label)
+    print('=' * 78)
+    for name, query in queries.items():
+        print('-- %s: %.2f ms/query over %d runs' % (name, timing(query, iterations), iterations))
+        print(explain(query))
+        print()
+
+
+def main(iterations=20):
+    with create_app(migrations=False).app_context():
+        venue_id = db.session.query(Show.venue_id).group_by(Show.venue_id).\
+            order_by(func.count(Show.id).desc()).limit(1).scalar()
+        artist_id = db.session.query(Show.artist_id).group_by(Show.artist_id).\
+            order_by(func.count(Show.id).desc()).limit(1).scalar()
+        if venue_id is None or artist_id is None:
+            sys.exit('No shows in the database, nothing to benchmark.')
+        print('Show rows: %d, venue %d, artist %d' % (Show.query.count(), venue_id, artist_id))
+        queries = detail_queries(venue_id, artist_id)
+
+        report('with indexes', queries, iterations)
+        try:
+            for index in INDEXES:
+                db.session.execute(text('DROP INDEX IF EXISTS "%s"' % index))
+            report('without indexes', queries, iterations)
+        finally:
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,89 @@
+"""Partition pruning of the Show queries.
+
+Runs EXPLAIN ANALYZE on the queries that read Show by start_time against the
+configured database and reports, for each, how many of Show's partitions
+the plan kept and how many it actually scanned; the rest were pruned when
+planning or skipped at run time (the ordered scans stop at their LIMIT).
+With --plans the plans are printed too. The exit status is 1 when a query
+scans every partition. PostgreSQL only, after `flask db upgrade` or a
+benchmarks.generate run.
+
+    python -m benchmarks.show_partitions [--plans]
+"""
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+import partitions
+from app import create_app
+from extensions import db
+from models import Venue, Artist, Show
+from queries import detail_shows, show_listing
+
+PARTITION = re.compile(r' on "?(Show_(?:y\d{4}m\d{2}|rest))"?')
+
+
+def show_queries(venue_id, artist_id, now):
+    middle = db.session.query(Show.start_time, Show.id).order_by(Show.start_time.desc(), Show.id.desc()).\
+        offset(Show.query.count() // 2).first()
+    return {
+        'show_venue': detail_shows(Artist, Show.artist_id, Show.venue_id, venue_id, now),
+        'show_artist': detail_shows(Venue, Show.venue_id, Show.artist_id, artist_id, now),
+        'shows, first page': show_listing(None, None),
+        'shows, middle page': show_listing(None, tuple(middle)),
+        'counter rollover window': db.session.query(func.count(Show.id)).
+        filter(Show.start_time > now.replace(day=1), Show.start_time <= now),
+    }
+
+
+def explain(query):
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return [row[0] for row in db.session.execute(text('EXPLAIN (ANALYZE, COSTS OFF) ' + str(statement)))]
+
+
+def scanned(plan):
+    # the partitions in the plan, and those among them that were scanned
+    planned, executed = set(), set()
+    for line in plan:
+        match = PARTITION.search(line)
+        if match:
+            planned.add(match.group(1))
+            if '(never executed)' not in line:
+                executed.add(match.group(1))
+    return planned, executed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    with create_app(migrations=False).app_context():
+        if not partitions.partitioned():
+            sys.exit('Show is only partitioned on PostgreSQL.')
+        total = len(partitions.attached())
+        venue_id = db.session.query(Show.venue_id).group_by(Show.venue_id).\
+            order_by(func.count(Show.id).desc()).limit(1).scalar()
+        artist_id = db.session.query(Show.artist_id).group_by(Show.artist_id).\
+            order_by(func.count(Show.id).desc()).limit(1).scalar()
+        if venue_id is None or artist_id is None:
+            sys.exit('No shows in the database, nothing to check.')
+        print('Show partitions: %d, venue %d, artist %d' % (total, venue_id, artist_id))
+        unpruned = []
+        for name, query in show_queries(venue_id, artist_id, datetime.now()).items():
+            plan = explain(query)
+            planned, executed = scanned(plan)
+            print('%-30s planned %4d  scanned %4d  of %d' % (name, len(planned), len(executed), total))
+            if '--plans' in argv:
+                print('\n'.join(plan))
+                print()
+            if len(executed) == total:
+                unpruned.append(name)
+        db.session.rollback()
+    if unpruned:
+        print('Scanning every partition: %s' % ', '.join(unpruned))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""Worker boot: a new interpreter importing the app, building it with the
+production config and serving its first request, as in benchmarks.boot.
+"""
+from benchmarks import boot
+
+
+def test_worker_boot(benchmark, monkeypatch, database_url):
+    # the worker inherits the environment; point it at the benchmark database
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    monkeypatch.setenv('SECRET_KEY', 'benchmark')
+    timings = benchmark.pedantic(lambda: boot.boot('production')[0], rounds=5, iterations=1)
+    assert timings['status'] == 200
@@ -0,0 +1,104 @@
+"""Behaviour of the past_count / future_count counters, on a small database.
+
+Like test_page_cache.py these are not benchmarks: they write shows through
+the app's own paths against a SQLite file in tmp_path and check the counters
+after each step.
+"""
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Venue, Artist
+from queries import reconcile_counters, roll_over_counters
+from scheduling import schedule_shows
+
+WATERMARK = datetime(2030, 1, 1)
+
+
+@pytest.fixture
+def app(tmp_path):
+    fyyur = create_app('testing', migrations=False, SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'counters.db'))
+    with fyyur.app_context():
+        db.create_all()
+        reconcile_counters(WATERMARK)
+        yield fyyur
+        db.session.remove()
+
+
+@pytest.fixture
+def entities(app):
+    venues = [Venue(name='Venue %d' % number, city='Boise', state='ID', genres=[]) for number in range(2)]
+    artist = Artist(name='Artist', genres=[])
+    db.session.add_all(venues + [artist])
+    db.session.commit()
+    return [venue.id for venue in venues], artist.id
+
+
+def counters(model, entity_id):
+    db.session.expire_all()
+    entity = db.session.get(model, entity_id)
+    return entity.past_count, entity.future_count
+
+
+def book(artist_id, venue_id, *start_times):
+    report = schedule_shows(artist_id, [{'venue_id': venue_id, 'start_time': start_time} for start_time in start_times])
+    assert report['accepted'] == len(start_times), report
+
+
+def test_new_shows_count_as_past_or_future_of_the_watermark(entities):
+    (venue_id, _), artist_id = entities
+    book(artist_id, venue_id, '2029-12-01T20:00', '2030-02-01T20:00', '2030-03-01T20:00')
+    assert counters(Venue, venue_id) == (1, 2)
+    assert counters(Artist, artist_id) == (1, 2)
+
+
+def test_refused_shows_are_not_counted(entities):
+    (venue_id, _), artist_id = entities
+    book(artist_id, venue_id, '2030-02-01T20:00')
+    report = schedule_shows(artist_id, [{'venue_id': venue_id, 'start_time': '2030-02-01T21:00'}])
+    assert report['rejected'] == 1
+    assert counters(Venue, venue_id) == (0, 1)
+    assert counters(Artist, artist_id) == (0, 1)
+
+
+def test_deleting_a_venue_takes_its_shows_off_the_artist(app, entities):
+    (kept, deleted), artist_id = entities
+    book(artist_id, kept, '2029-12-01T20:00', '2030-02-01T20:00')
+    book(artist_id, deleted, '2029-12-02T20:00', '2030-02-02T20:00', '2030-02-03T20:00')
+    assert counters(Artist, artist_id) == (2, 3)
+    response = app.test_client().delete('/venues/%d' % deleted)
+    assert response.status_code == 200 and response.json['success']
+    assert counters(Artist, artist_id) == (1, 1)
+    assert counters(Venue, kept) == (1, 1)
+
+
+def test_rollover_moves_started_shows_to_past(entities):
+    (venue_id, other_id), artist_id = entities
+    book(artist_id, venue_id, '2030-01-15T20:00', '2030-03-01T20:00')
+    book(artist_id, other_id, '2030-01-20T20:00')
+    assert roll_over_counters(datetime(2030, 2, 1)) == 2
+    assert counters(Venue, venue_id) == (1, 1)
+    assert counters(Venue, other_id) == (1, 0)
+    assert counters(Artist, artist_id) == (2, 1)
+    # a second run over the same window moves nothing
+    assert roll_over_counters(datetime(2030, 2, 1)) == 0
+    assert counters(Artist, artist_id) == (2, 1)
+
+
+def test_shows_booked_after_a_rollover_use_the_new_watermark(entities):
+    (venue_id, _), artist_id = entities
+    roll_over_counters(datetime(2030, 2, 1))
+    book(artist_id, venue_id, '2030-01-15T20:00', '2030-03-01T20:00')
+    assert counters(Venue, venue_id) == (1, 1)
+
+
+def test_reconcile_rebuilds_counters_from_the_shows(entities):
+    (venue_id, _), artist_id = entities
+    book(artist_id, venue_id, '2029-12-01T20:00', '2030-02-01T20:00', '2030-03-01T20:00')
+    Venue.query.update({Venue.past_count: 7, Venue.future_count: -3}, synchronize_session=False)
+    db.session.commit()
+    assert reconcile_counters(datetime(2030, 2, 15)) == 3
+    assert counters(Venue, venue_id) == (2, 1)
+    assert counters(Artist, artist_id) == (2, 1)
@@ -0,0 +1,55 @@
+"""Microbenchmarks for the `datetime` Jinja filter.
+
+`legacy` is the filter as it was: views passed strftime strings, which were
+parsed back with dateutil and formatted through babel's per-call locale and
+pattern lookup. The other cases time formatting.format_datetime on the
+native datetimes the views pass now, with and without a venue timezone.
+"""
+from datetime import datetime, timedelta, timezone
+
+import babel.dates
+import dateutil.parser
+import pytest
+
+import formatting
+
+TIMES = [datetime(2021, 5, 21, 18) + timedelta(days=day, minutes=30 * (day % 9)) for day in range(500)]
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def test_legacy(benchmark):
+    strings = [time.strftime("%m/%d/%Y, %H:%M") for time in TIMES]
+    result = benchmark(lambda: [legacy_format_datetime(value, 'full') for value in strings])
+    assert result[0] == 'Friday May, 21, 2021 at 6:00PM'
+
+
+@pytest.mark.parametrize('zone', [None, 'America/Chicago'])
+def test_native(benchmark, zone):
+    result = benchmark(lambda: [formatting.format_datetime(value, 'full', zone) for value in TIMES])
+    assert result[0] == 'Friday May, 21, 2021 at 6:00PM' + (' CDT' if zone else '')
+
+
+def test_aware_converted(benchmark):
+    aware = [time.replace(tzinfo=timezone.utc) for time in TIMES]
+    result = benchmark(lambda: [formatting.format_datetime(value, 'full', 'America/Los_Angeles') for value in aware])
+    assert result[0] == 'Friday May, 21, 2021 at 11:00AM PDT'
+
+
+def test_shows_template(benchmark, app):
+    # one /shows page worth of tiles through the real template
+    shows = [{
+        'venue_id': 1, 'venue_name': 'The Musical Hop', 'artist_id': 1, 'artist_name': 'Guns N Petals',
+        'artist_image_link': '', 'start_time': time, 'timezone': 'America/New_York'
+    } for time in TIMES[:30]]
+    template = app.jinja_env.get_template('pages/shows.html')
+    with app.test_request_context('/shows'):
+        html = benchmark(template.render, shows=shows, pages={'next': None, 'prev': None})
+    assert 'Friday May, 21, 2021 at 6:00PM EDT' in html
@@ -0,0 +1,96 @@
+"""Behaviour of the page cache, on a small database of its own.
+
+Unlike the rest of the suite these are not benchmarks: each test builds apps
+with the memory backend against a SQLite file in tmp_path, writes through one
+of them and checks which body the next request gets.
+"""
+import shutil
+import sqlite3
+import time
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Venue
+
+
+def make_app(uri, **settings):
+    return create_app('testing', migrations=False, SQLALCHEMY_DATABASE_URI=uri, CACHE_BACKEND='memory', **settings)
+
+
+@pytest.fixture
+def database(tmp_path):
+    uri = 'sqlite:///' + str(tmp_path / 'cache.db')
+    app = make_app(uri)
+    with app.app_context():
+        db.create_all()
+        venue = Venue(name='OldName', city='Boise', state='ID', genres=['Jazz'])
+        db.session.add(venue)
+        db.session.commit()
+        venue_id = venue.id
+        db.session.remove()
+    return uri, venue_id
+
+
+def venue_form(name):
+    return {'name': name, 'city': 'Boise', 'state': 'ID', 'address': '1 Main St', 'phone': '208-555-0100',
+            'genres': ['Jazz'], 'facebook_link': '', 'image_link': '', 'website_link': '', 'seeking_description': ''}
+
+
+def test_other_worker_serves_new_body_under_new_etag(database):
+    # two workers, each with its own memory cache; only the first sees the edit
+    uri, venue_id = database
+    first, second = make_app(uri).test_client(), make_app(uri).test_client()
+    url = '/venues/%d' % venue_id
+    old = second.get(url)
+    assert b'OldName' in old.data
+    assert first.post(url + '/edit', data=venue_form('NewName')).status_code == 302
+    new = second.get(url)
+    assert b'NewName' in new.data and b'OldName' not in new.data
+    assert new.headers['ETag'] != old.headers['ETag']
+    assert second.get(url, headers={'If-None-Match': new.headers['ETag']}).status_code == 304
+
+
+def test_write_invalidates_detail_and_listing(database):
+    uri, venue_id = database
+    app = make_app(uri)
+    client = app.test_client()
+    for url in ('/venues/%d' % venue_id, '/venues'):
+        assert b'OldName' in client.get(url).data
+        assert b'OldName' in client.get(url).data
+    counts = app.extensions['page_cache'].counts
+    assert counts['hits'] == 2
+    assert client.post('/venues/%d/edit' % venue_id, data=venue_form('NewName')).status_code == 302
+    for url in ('/venues/%d' % venue_id, '/venues'):
+        page = client.get(url).data
+        assert b'NewName' in page and b'OldName' not in page
+
+
+def test_replica_read_right_after_a_write_is_not_cached(database, tmp_path):
+    # the replica is a copy of the primary that replays the edit late
+    uri, venue_id = database
+    replica = tmp_path / 'replica.db'
+    shutil.copy(uri[len('sqlite:///'):], replica)
+    app = make_app(uri, SECRET_KEY='test', DATABASE_REPLICA_URIS=['sqlite:///' + str(replica)],
+                   DATABASE_READ_YOUR_WRITES=1)
+    reader, writer = app.test_client(), app.test_client()
+    url = '/venues/%d' % venue_id
+    counts = app.extensions['page_cache'].counts
+    assert b'OldName' in reader.get(url).data
+    assert counts['sets'] == 1
+    assert writer.post(url + '/edit', data=venue_form('NewName')).status_code == 302
+    # the writer reads the primary; the reader still gets the lagging replica,
+    # and that page is served but not stored
+    assert b'NewName' in writer.get(url).data
+    assert b'OldName' in reader.get(url).data
+    assert counts['replica_skips'] == 1
+    with sqlite3.connect(str(replica)) as connection:
+        connection.execute('UPDATE "Venue" SET name = ?, updated_at = ? WHERE id = ?',
+                           ('NewName', '2100-01-01 00:00:00.000000', venue_id))
+    assert b'NewName' in reader.get(url).data
+    # once the window has passed, replica pages are cached again
+    time.sleep(1.1)
+    sets = counts['sets']
+    reader.get('/venues')
+    assert counts['sets'] == sets + 1
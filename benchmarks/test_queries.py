@@ -0,0 +1,171 @@
+"""One benchmark per query helper, without rendering.
+
+Each round runs the query to completion inside a request context, as the
+views do; the page cache and the HTTP layer are not involved.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import conflicts
+from feed import FEED_RANGES, FEED_PAGE_SIZE, upcoming_feed, feed_cities, refresh_feed
+from choices import GENRES
+from bulk import export_batches, export_watermark
+from extensions import db
+from models import Venue, Artist, Show, genre_members
+from queries import search_results, venue_listing, artist_listing, show_listing, detail_shows, more_shows, \
+    split_shows, detail_validator, listing_validator, venue_pages, artist_pages, roll_over_counters, \
+    reconcile_counters, decode_cursor
+
+pytestmark = pytest.mark.usefixtures('request_context')
+
+
+def run(benchmark, function, *args):
+    # the session is cleared between rounds so no round reads another's identity map
+    def query():
+        try:
+            return function(*args)
+        finally:
+            db.session.remove()
+    return benchmark(query)
+
+
+@pytest.mark.parametrize('model', [Venue, Artist], ids=['venue', 'artist'])
+@pytest.mark.parametrize('term', ['a', 'the', 'blue'])
+def test_search_results(benchmark, model, term):
+    assert run(benchmark, search_results, model, term, 1)['count'] >= 0
+
+
+def test_search_results_by_genre(benchmark):
+    run(benchmark, search_results, Venue, 'the', 1, 'Jazz')
+
+
+def test_search_results_last_page(benchmark):
+    run(benchmark, search_results, Venue, 'a', 50)
+
+
+def test_venue_listing(benchmark):
+    assert run(benchmark, lambda: venue_listing(None).all())
+
+
+def test_venue_listing_next_page(benchmark, samples):
+    run(benchmark, lambda: venue_listing(samples['venue_middle']).all())
+
+
+@pytest.mark.parametrize('genre', ['Jazz', GENRES[-1]])
+def test_venue_listing_by_genre(benchmark, genre):
+    run(benchmark, lambda: venue_listing(None, genre).all())
+
+
+def test_artist_listing(benchmark):
+    assert run(benchmark, lambda: artist_listing().all())
+
+
+def test_artist_listing_by_genre(benchmark):
+    run(benchmark, lambda: artist_listing('Jazz').all())
+
+
+def test_show_listing(benchmark):
+    assert run(benchmark, lambda: show_listing(None, None).all())
+
+
+def test_show_listing_deep_page(benchmark, samples):
+    assert run(benchmark, lambda: show_listing(None, samples['show_middle']).all())
+
+
+def test_show_listing_newer_page(benchmark, samples):
+    assert run(benchmark, lambda: show_listing(samples['show_middle'], None).all())
+
+
+@pytest.mark.parametrize('which', ['busiest', 'median'])
+def test_venue_detail_shows(benchmark, samples, which):
+    now = samples['now']
+    run(benchmark, lambda: split_shows(
+        detail_shows(Artist, Show.artist_id, Show.venue_id, samples['venue'][which], now).all(), now))
+
+
+@pytest.mark.parametrize('which', ['busiest', 'median'])
+def test_artist_detail_shows(benchmark, samples, which):
+    now = samples['now']
+    run(benchmark, lambda: split_shows(
+        detail_shows(Venue, Show.venue_id, Show.artist_id, samples['artist'][which], now).all(), now))
+
+
+@pytest.mark.parametrize('when', ['past', 'upcoming'])
+def test_more_shows(benchmark, samples, when):
+    after = decode_cursor(samples['now_cursor'], datetime.fromisoformat, int)
+    run(benchmark, more_shows, Artist, Show.artist_id, Show.venue_id, samples['venue']['busiest'], when, after)
+
+
+def test_detail_validator(benchmark, samples):
+    assert run(benchmark, detail_validator, Venue, samples['venue']['busiest'])
+
+
+def test_venues_listing_validator(benchmark):
+    run(benchmark, lambda: listing_validator('venues', venue_listing(None), Venue.updated_at))
+
+
+def test_shows_listing_validator(benchmark):
+    run(benchmark, lambda: listing_validator('shows', show_listing(None, None),
+                                             Show.updated_at, Venue.updated_at, Artist.updated_at))
+
+
+def test_genre_members(benchmark):
+    run(benchmark, lambda: db.session.execute(genre_members(Venue, 'Jazz')).all())
+
+
+@pytest.mark.parametrize('pages', [venue_pages, artist_pages], ids=['venue', 'artist'])
+def test_invalidated_pages(benchmark, samples, pages):
+    kind = 'venue' if pages is venue_pages else 'artist'
+    assert run(benchmark, pages, samples[kind]['busiest'])
+
+
+@pytest.mark.parametrize('loaded', [False, True], ids=['cold', 'warm'])
+def test_show_conflicts(benchmark, samples, loaded):
+    # a 60-show tour of the busiest artist at the busiest venue, checked
+    # against their booked shows; cold rounds load the in-memory intervals
+    # first where there is no range index
+    start = samples['now'].replace(hour=20, minute=0, second=0, microsecond=0)
+    records = [{'venue_id': samples['venue']['busiest'], 'artist_id': samples['artist']['busiest'],
+                'start_time': start + timedelta(days=day), 'end_time': start + timedelta(days=day, hours=2)}
+               for day in range(60)]
+
+    def check():
+        if not loaded:
+            conflicts.forget()
+        return conflicts.overlapping(records)
+    run(benchmark, check)
+
+
+@pytest.mark.parametrize('city', [None, ('New York', 'NY')], ids=['everywhere', 'city'])
+def test_upcoming_feed(benchmark, city):
+    run(benchmark, lambda: upcoming_feed(FEED_RANGES['month'], *(city or ())).limit(FEED_PAGE_SIZE + 1).all())
+
+
+def test_feed_cities(benchmark):
+    run(benchmark, feed_cities, FEED_RANGES['month'])
+
+
+def test_refresh_feed(benchmark):
+    # nothing has started or come within the horizon since the previous round,
+    # so this times the two statements over an up-to-date feed
+    run(benchmark, refresh_feed)
+
+
+def test_export_batches(benchmark):
+    run(benchmark, lambda: sum(len(batch) for batch in export_batches(Venue, None, export_watermark(Venue))))
+
+
+def test_export_batches_incremental(benchmark):
+    # the last day's changes and deletes
+    watermark = export_watermark(Show)
+    run(benchmark, lambda: sum(len(batch) for batch in export_batches(Show, watermark - timedelta(days=1), watermark)))
+
+
+def test_roll_over_counters(benchmark):
+    # nothing has started since the previous round, so this times the lock and the window check
+    run(benchmark, roll_over_counters)
+
+
+def test_reconcile_counters(benchmark):
+    benchmark.pedantic(lambda: (reconcile_counters(), db.session.remove()), rounds=3, iterations=1)
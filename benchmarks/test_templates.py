@@ -0,0 +1,80 @@
+"""Cold and warm render times for each template the views render.
+
+Contexts are captured from real requests against the benchmark database.
+Each template is then rendered three ways:
+
+* cold     - a worker's first render with no bytecode cache: the template,
+             its layout and includes are compiled, then rendered
+* bytecode - a worker's first render with a warm TEMPLATE_CACHE_DIR:
+             bytecode is loaded from disk, then rendered
+* warm     - every later render, from the environment's template cache
+"""
+import pytest
+from flask import template_rendered
+
+from templating import HashedBytecodeCache
+
+TEMPLATES = {
+    'pages/home.html': '/',
+    'pages/venues.html': '/venues',
+    'pages/artists.html': '/artists',
+    'pages/shows.html': '/shows',
+    'pages/upcoming_shows.html': '/shows/upcoming?range=month',
+    'pages/show_venue.html': '/venues/%(venue)d',
+    'pages/show_artist.html': '/artists/%(artist)d',
+    'pages/show_venue_tiles.html': '/venues/%(venue)d/shows?after=%(now_cursor)s',
+    'pages/show_artist_tiles.html': '/artists/%(artist)d/shows?after=%(now_cursor)s',
+    'pages/search_venues.html': ('/venues/search', {'search_term': 'the'}),
+    'pages/search_artists.html': ('/artists/search', {'search_term': 'band'}),
+    'pages/profile.html': '/_debug/profile',
+    'forms/new_venue.html': '/venues/create',
+    'forms/new_artist.html': '/artists/create',
+    'forms/new_show.html': '/shows/create',
+    'forms/edit_venue.html': '/venues/%(venue)d/edit',
+    'forms/edit_artist.html': '/artists/%(artist)d/edit',
+    'errors/404.html': '/no-such-page',
+}
+
+
+@pytest.fixture(scope='module')
+def contexts(app, samples):
+    # the context each template was rendered with by its view
+    captured = {}
+
+    def capture(sender, template, context, **extra):
+        captured.setdefault(template.name, dict(context))
+
+    ids = {'venue': samples['venue']['busiest'], 'artist': samples['artist']['busiest'],
+           'now_cursor': samples['now_cursor']}
+    client = app.test_client()
+    with template_rendered.connected_to(capture, app):
+        for request in TEMPLATES.values():
+            if isinstance(request, tuple):
+                client.post(request[0], data=request[1]).close()
+            else:
+                client.get(request % ids).close()
+    return captured
+
+
+@pytest.fixture(scope='module')
+def bytecode_cache(app, tmp_path_factory):
+    cache = HashedBytecodeCache(str(tmp_path_factory.mktemp('jinja')))
+    environment = app.jinja_env.overlay(cache_size=0, bytecode_cache=cache)
+    for name in app.jinja_env.list_templates():
+        environment.get_template(name)
+    return cache
+
+
+@pytest.mark.parametrize('name', sorted(TEMPLATES))
+@pytest.mark.parametrize('mode', ['cold', 'bytecode', 'warm'])
+def test_render(benchmark, app, contexts, bytecode_cache, mode, name):
+    context = contexts[name]
+    if mode == 'warm':
+        environment = app.jinja_env
+        environment.get_template(name)
+    else:
+        # no template cache, so every round compiles (or loads) the whole chain
+        environment = app.jinja_env.overlay(cache_size=0, bytecode_cache=bytecode_cache if mode == 'bytecode' else None)
+    with app.test_request_context():
+        html = benchmark(lambda: environment.get_template(name).render(context))
+    assert html
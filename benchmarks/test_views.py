@@ -0,0 +1,307 @@
+"""One benchmark per view, through the Flask test client.
+
+Pages are requested without validators and with the page cache off, so each
+round runs the view's queries and renders its template.
+"""
+import io
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+
+from choices import GENRES
+from extensions import db
+from models import Venue
+from scheduling import insert_shows
+
+
+def fetch(client, method, url, data=None):
+    # reads the whole body and closes it, as a WSGI server would, so streamed
+    # responses are timed to the last byte and release their connection
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+    response.close()
+    return response
+
+
+def get(benchmark, client, url, status=200):
+    response = benchmark(fetch, client, 'GET', url)
+    assert response.status_code == status, response.data[:500]
+    return response
+
+
+def post(benchmark, client, url, data, status=200):
+    response = benchmark(fetch, client, 'POST', url, data)
+    assert response.status_code == status, response.data[:500]
+    return response
+
+
+def test_index(benchmark, client):
+    get(benchmark, client, '/')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+def test_venues(benchmark, client):
+    get(benchmark, client, '/venues')
+
+
+def test_venues_next_page(benchmark, client, samples):
+    get(benchmark, client, '/venues?after=' + samples['venue_cursor'])
+
+
+def test_venues_by_genre(benchmark, client):
+    get(benchmark, client, '/venues?genre=' + GENRES[-1])
+
+
+@pytest.mark.parametrize('term', ['a', 'the', 'blue hall'])
+def test_search_venues(benchmark, client, term):
+    post(benchmark, client, '/venues/search', {'search_term': term})
+
+
+def test_search_venues_by_genre(benchmark, client):
+    post(benchmark, client, '/venues/search', {'search_term': 'the', 'genre': 'Jazz'})
+
+
+def test_search_venues_async(benchmark, async_client):
+    post(benchmark, async_client, '/venues/search', {'search_term': 'the'})
+
+
+@pytest.mark.parametrize('which', ['busiest', 'median'])
+def test_show_venue(benchmark, client, samples, which):
+    get(benchmark, client, '/venues/%d' % samples['venue'][which])
+
+
+@pytest.mark.parametrize('which', ['busiest', 'median'])
+def test_show_venue_async(benchmark, async_client, samples, which):
+    get(benchmark, async_client, '/venues/%d' % samples['venue'][which])
+
+
+def test_venue_shows(benchmark, client, samples):
+    get(benchmark, client, '/venues/%d/shows?when=past&after=%s' % (samples['venue']['busiest'], samples['now_cursor']))
+
+
+def test_create_venue_form(benchmark, client):
+    get(benchmark, client, '/venues/create')
+
+
+def venue_form(name):
+    return {
+        'name': name, 'city': 'Austin', 'state': 'TX', 'address': '1 Benchmark St', 'phone': '512-555-0100',
+        'genres': ['Jazz', 'Folk'], 'facebook_link': 'https://www.facebook.com/benchmark',
+        'image_link': 'https://images.example.com/benchmark.jpg', 'seeking_talent': 'y',
+        'seeking_description': 'Benchmark', 'website_link': 'https://benchmark.example.com',
+    }
+
+
+def test_create_venue_submission(benchmark, client, written):
+    post(benchmark, client, '/venues/create', venue_form('Benchmark Venue'))
+
+
+def test_edit_venue(benchmark, client, samples):
+    get(benchmark, client, '/venues/%d/edit' % samples['venue']['median'])
+
+
+def test_edit_venue_submission(benchmark, client, samples, written):
+    post(benchmark, client, '/venues/%d/edit' % samples['venue']['median'], venue_form('Benchmark Venue'), status=302)
+
+
+def test_delete_venue(benchmark, app, client, samples, written):
+    # each round deletes a fresh venue with a few booked shows
+    rounds = itertools.count()
+
+    def setup():
+        start = datetime(3100, 1, 1, 20) + timedelta(days=10 * next(rounds))
+        with app.app_context():
+            venue = Venue(name='Benchmark Venue', city='Boise', state='ID', genres=[GENRES[0]])
+            db.session.add(venue)
+            db.session.commit()
+            venue_id = venue.id
+            insert_shows([{'venue_id': venue_id, 'artist_id': samples['artist']['median'],
+                           'start_time': start + timedelta(days=day), 'end_time': start + timedelta(days=day, hours=2),
+                           'updated_at': datetime.utcnow()} for day in range(5)])
+            db.session.remove()
+        return (client, 'DELETE', '/venues/%d' % venue_id), {}
+
+    response = benchmark.pedantic(fetch, setup=setup, rounds=20)
+    assert response.status_code == 200, response.data[:500]
+    assert response.json['success']
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+def test_artists(benchmark, client):
+    get(benchmark, client, '/artists')
+
+
+def test_artists_by_genre(benchmark, client):
+    get(benchmark, client, '/artists?genre=' + GENRES[-1])
+
+
+@pytest.mark.parametrize('term', ['a', 'band', 'velvet foxes'])
+def test_search_artists(benchmark, client, term):
+    post(benchmark, client, '/artists/search', {'search_term': term})
+
+
+@pytest.mark.parametrize('which', ['busiest', 'median'])
+def test_show_artist(benchmark, client, samples, which):
+    get(benchmark, client, '/artists/%d' % samples['artist'][which])
+
+
+@pytest.mark.parametrize('which', ['busiest', 'median'])
+def test_show_artist_async(benchmark, async_client, samples, which):
+    get(benchmark, async_client, '/artists/%d' % samples['artist'][which])
+
+
+def test_artist_shows(benchmark, client, samples):
+    get(benchmark, client, '/artists/%d/shows?when=past&after=%s' % (samples['artist']['busiest'], samples['now_cursor']))
+
+
+def test_create_artist_form(benchmark, client):
+    get(benchmark, client, '/artists/create')
+
+
+def artist_form(name):
+    form = venue_form(name)
+    del form['address'], form['seeking_talent']
+    form['seeking_venue'] = 'y'
+    return form
+
+
+def test_create_artist_submission(benchmark, client, written):
+    post(benchmark, client, '/artists/create', artist_form('Benchmark Artist'))
+
+
+def test_edit_artist(benchmark, client, samples):
+    get(benchmark, client, '/artists/%d/edit' % samples['artist']['median'])
+
+
+def test_edit_artist_submission(benchmark, client, samples, written):
+    post(benchmark, client, '/artists/%d/edit' % samples['artist']['median'], artist_form('Benchmark Artist'),
+         status=302)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def test_shows(benchmark, client):
+    get(benchmark, client, '/shows')
+
+
+def test_shows_deep_page(benchmark, client, samples):
+    get(benchmark, client, '/shows?after=' + samples['show_cursor'])
+
+
+@pytest.mark.parametrize('url', ['/shows/upcoming?range=week', '/shows/upcoming?range=month',
+                                 '/shows/upcoming?range=month&city=New+York&state=NY'])
+def test_upcoming_shows(benchmark, client, url):
+    get(benchmark, client, url)
+
+
+def test_create_shows(benchmark, client):
+    get(benchmark, client, '/shows/create')
+
+
+def test_create_show_submission(benchmark, client, samples, written):
+    # each round books the median venue and artist a day later than the last
+    rounds = itertools.count()
+
+    def submit():
+        start_time = datetime(3200, 1, 1, 20) + timedelta(days=next(rounds))
+        return fetch(client, 'POST', '/shows/create', {
+            'venue_id': samples['venue']['median'],
+            'artist_id': samples['artist']['median'],
+            'start_time': start_time.isoformat(' '),
+        })
+
+    response = benchmark(submit)
+    assert response.status_code == 200 and b'Show was successfully listed!' in response.data, response.data[:500]
+
+
+def test_schedule_shows(benchmark, client, samples, written):
+    # a 60-show tour for the median artist per request, plus one unknown venue
+    # refused on its own; each round books a different year
+    rounds = itertools.count()
+
+    def schedule():
+        year = 2040 + next(rounds)
+        venues = [samples['venue']['median'], samples['venue']['busiest']]
+        shows = [{'venue_id': venues[day % 2], 'start_time': '%d-%02d-%02dT20:00' % (year, day // 28 + 1, day % 28 + 1)}
+                 for day in range(60)]
+        shows.append({'venue_id': 0, 'start_time': '%d-12-31T20:00' % year})
+        response = client.post('/shows/schedule', json={'artist_id': samples['artist']['median'], 'shows': shows})
+        response.close()
+        return response
+
+    response = benchmark(schedule)
+    report = response.get_json()
+    assert response.status_code == 200 and report['accepted'] == 60, response.data[:500]
+    assert [error['row'] for error in report['errors']] == [60]
+
+
+#  API and export
+#  ----------------------------------------------------------------
+
+@pytest.mark.parametrize('kind', ['venues', 'artists', 'shows'])
+def test_api_listing(benchmark, client, kind):
+    get(benchmark, client, '/api/v1/%s?limit=100' % kind)
+
+
+def test_api_upcoming_shows(benchmark, client):
+    get(benchmark, client, '/api/v1/shows/upcoming?range=month&city=New+York&state=NY')
+
+
+def test_api_venues_by_genre(benchmark, client):
+    get(benchmark, client, '/api/v1/venues?genre=Jazz&fields=id,name')
+
+
+def test_api_venue(benchmark, client, samples):
+    get(benchmark, client, '/api/v1/venues/%d' % samples['venue']['busiest'])
+
+
+def test_api_venue_shows(benchmark, client, samples):
+    get(benchmark, client, '/api/v1/venues/%d/shows?after=%s' % (samples['venue']['busiest'], samples['now_cursor']))
+
+
+def test_api_artist(benchmark, client, samples):
+    get(benchmark, client, '/api/v1/artists/%d' % samples['artist']['busiest'])
+
+
+def test_api_artist_shows(benchmark, client, samples):
+    get(benchmark, client, '/api/v1/artists/%d/shows?after=%s' % (samples['artist']['busiest'], samples['now_cursor']))
+
+
+@pytest.mark.parametrize('kind', ['venues', 'artists'])
+def test_api_search(benchmark, client, kind):
+    get(benchmark, client, '/api/v1/search/%s?q=the' % kind)
+
+
+@pytest.mark.parametrize('kind', ['venues', 'artists'])
+def test_export(benchmark, client, kind):
+    get(benchmark, client, '/export/%s?format=jsonl' % kind)
+
+
+def test_import_shows(benchmark, client, samples, written):
+    # 100 future shows of the median venue and artist per upload, one a day;
+    # each round books a different stretch of days
+    rounds = itertools.count()
+
+    def upload():
+        first = datetime(3000, 1, 1, 20) + timedelta(days=100 * next(rounds))
+        rows = ''.join('%d,%d,%s\n' % (samples['venue']['median'], samples['artist']['median'], first + timedelta(days=day))
+                       for day in range(100))
+        body = ('venue_id,artist_id,start_time\n' + rows).encode()
+        return fetch(client, 'POST', '/import/shows', {'file': (io.BytesIO(body), 'shows.csv')})
+
+    response = benchmark(upload)
+    assert response.status_code == 200 and response.get_json()['accepted'] == 100, response.data[:500]
+
+
+#  Debug
+#  ----------------------------------------------------------------
+
+@pytest.mark.parametrize('url', ['/_debug/cache', '/_debug/pool', '/_debug/profile?format=json'])
+def test_debug(benchmark, client, url):
+    get(benchmark, client, url)
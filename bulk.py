@@ -0,0 +1,256 @@
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import (Blueprint, Response, request, abort, jsonify, current_app, stream_with_context, send_from_directory,
+  url_for)
+from sqlalchemy import func, select, null
+from sqlalchemy.exc import IntegrityError, DataError
+
+import search
+import importer
+import exporter
+from database import read_only
+from extensions import db, page_cache
+from models import Venue, Artist, Show, Genre, Tombstone, GENRE_ASSOCIATIONS
+from scheduling import insert_shows, show_end, duration_errors
+
+# Bulk import and export, over HTTP and as the top-level `flask import` and
+# `flask export` commands.
+
+bp = Blueprint('bulk', __name__, cli_group=None)
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+IMPORT_BATCH_SIZE = 1000
+# the opaque name an upload's rejected rows are kept under in IMPORT_ERROR_DIR
+ERROR_TOKEN = re.compile(r'[0-9a-f]{32}')
+
+VENUE_COLUMNS = ['name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'facebook_link',
+  'website_link', 'seeking_talent', 'seeking_description', 'timezone']
+ARTIST_COLUMNS = ['name', 'city', 'state', 'phone', 'genres', 'image_link', 'facebook_link',
+  'website_link', 'seeking_venue', 'seeking_description']
+
+def entity_record(data, columns):
+  record = {column: data[column] for column in columns}
+  record.update({
+    "search_text": search.search_document(data['name'], data['city'], data['state'], data['genres']),
+    "past_count": 0,
+    "future_count": 0,
+    "updated_at": datetime.utcnow()
+  })
+  return record
+
+def validate_venue(row):
+  from forms import VenueForm
+  data, errors = importer.validate_with(VenueForm, row, multiple=('genres',))
+  return (entity_record(data, VENUE_COLUMNS), None) if data else (None, errors)
+
+def validate_artist(row):
+  from forms import ArtistForm
+  data, errors = importer.validate_with(ArtistForm, row, multiple=('genres',))
+  return (entity_record(data, ARTIST_COLUMNS), None) if data else (None, errors)
+
+def validate_show(row):
+  from forms import ShowForm
+  data, errors = importer.validate_with(ShowForm, row)
+  if errors:
+    return None, errors
+  try:
+    venue_id, artist_id = int(data['venue_id']), int(data['artist_id'])
+  except (TypeError, ValueError):
+    return None, {"venue_id/artist_id": ["Must be integer ids."]}
+  end_time = show_end(data['start_time'], data['end_time'])
+  errors = duration_errors(data['start_time'], end_time)
+  if errors:
+    return None, errors
+  return {"venue_id": venue_id, "artist_id": artist_id, "start_time": data['start_time'], "end_time": end_time,
+    "updated_at": datetime.utcnow()}, None
+
+def insert_entities(model):
+  def insert(records):
+    # a multi-row INSERT returning the new ids, which link the genres
+    table = model.__table__
+    ids = db.session.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), records).scalars()
+    association, key = GENRE_ASSOCIATIONS[model]
+    genre_ids = dict(db.session.query(Genre.name, Genre.id))
+    links = [{key: entity_id, "genre_id": genre_ids[genre]}
+      for entity_id, record in zip(ids, records) for genre in set(record['genres'] or ()) if genre in genre_ids]
+    if links:
+      db.session.execute(association.insert(), links)
+
+  def write(records, lines=None, offset=0):
+    # one commit per batch. A batch the database refuses (a value too long
+    # for its column, a broken constraint) is rolled back and written again
+    # in halves, down to the rows it still refuses, which come back with the
+    # database's error; offset is the records' index in the caller's batch
+    try:
+      insert(records)
+      db.session.commit()
+      return {}
+    except (IntegrityError, DataError) as e:
+      db.session.rollback()
+      if len(records) == 1:
+        return {offset: {"row": [str(e.orig).splitlines()[0]]}}
+    middle = len(records) // 2
+    refused = write(records[:middle], offset=offset)
+    refused.update(write(records[middle:], offset=offset + middle))
+    return refused
+  return write
+
+IMPORTERS = {
+  "venues": (validate_venue, insert_entities(Venue)),
+  "artists": (validate_artist, insert_entities(Artist)),
+  "shows": (validate_show, insert_shows)
+}
+
+def import_stream(kind, stream, format, error_path, batch_size=IMPORT_BATCH_SIZE, progress=None):
+  validate, write = IMPORTERS[kind]
+  report = importer.run_import(kind, importer.read_rows(stream, format), validate, write,
+    error_path, batch_size, progress)
+  page_cache.clear()
+  return report
+
+@bp.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(importer.FORMATS), help='Defaults to the file extension.')
+@click.option('--errors', 'error_path', help='Where rejected rows go, defaults to PATH.errors.jsonl.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+def import_command(kind, path, format, error_path, batch_size):
+  """Bulk-load venues, artists or shows from a CSV or JSONL file."""
+  format = format or importer.detect_format(path)
+  with open(path, newline='', encoding='utf-8') as stream:
+    report = import_stream(kind, stream, format, error_path or path + '.errors.jsonl', batch_size,
+      progress=lambda report: click.echo(str(report), err=True))
+  click.echo(str(report))
+  if report.rejected:
+    click.echo('Rejected rows written to %s' % report.error_path)
+
+@bp.route('/import/<any(venues, artists, shows):kind>', methods=['POST'])
+def import_upload(kind):
+  upload = request.files.get('file')
+  if upload is None or not upload.filename:
+    abort(400)
+  try:
+    format = request.form.get('format') or importer.detect_format(upload.filename)
+  except ValueError:
+    abort(400)
+  # the rejected rows are served back under a random token, never a path
+  token = uuid.uuid4().hex
+  os.makedirs(current_app.config['IMPORT_ERROR_DIR'], exist_ok=True)
+  error_path = os.path.join(current_app.config['IMPORT_ERROR_DIR'], token + '.errors.jsonl')
+  report = import_stream(kind, importer.text_stream(upload.stream), format, error_path)
+  data = report.as_dict()
+  data['errors'] = url_for('bulk.import_errors', token=token) if report.rejected else None
+  return jsonify(data)
+
+@bp.route('/import/errors/<token>')
+def import_errors(token):
+  # an upload's rejected rows as JSONL: {"line", "row", "errors"} per line
+  if not ERROR_TOKEN.fullmatch(token):
+    abort(404)
+  return send_from_directory(current_app.config['IMPORT_ERROR_DIR'], token + '.errors.jsonl',
+    mimetype='application/x-ndjson')
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+EXPORT_BATCH_SIZE = 5000
+# updated_at is set before a transaction commits, so a row committed after an
+# export can carry an older one than its watermark; an incremental export
+# starts this long before its since, and consumers apply rows by id
+EXPORT_OVERLAP = timedelta(minutes=5)
+
+EXPORTS = {
+  "venues": Venue,
+  "artists": Artist,
+  "shows": Show
+}
+
+def export_columns(model):
+  # the table's columns, then deleted_at, only set on the rows of deleted ids
+  return [column for column in model.__table__.columns if column.key != 'search_text'] + \
+    [Tombstone.__table__.c.deleted_at]
+
+def export_watermark(model):
+  # the newest change to the table: an updated_at or a delete
+  changed = db.session.query(func.max(model.updated_at)).scalar()
+  deleted = db.session.query(func.max(Tombstone.deleted_at)).\
+    filter(Tombstone.table_name == model.__tablename__).scalar()
+  return max([moment for moment in (changed, deleted) if moment is not None], default=None)
+
+def export_batches(model, since, watermark):
+  # rows changed in (since - EXPORT_OVERLAP, watermark], through a
+  # server-side cursor; an incremental export walks the updated_at index,
+  # after the ids deleted in that span, a full one the primary key. The
+  # deletes go first, so an id SQLite handed out again arrives alive.
+  columns = export_columns(model)[:-1]
+  query = select(*columns, null().label('deleted_at')).where(model.updated_at <= watermark)
+  if since is not None:
+    since = since - EXPORT_OVERLAP
+    deleted = select(*[Tombstone.entity_id if column.key == 'id' else null().label(column.key) for column in columns],
+      Tombstone.deleted_at).where(Tombstone.table_name == model.__tablename__, Tombstone.deleted_at > since,
+      Tombstone.deleted_at <= watermark).order_by(Tombstone.deleted_at, Tombstone.id)
+    for batch in export_rows(deleted):
+      yield batch
+    query = query.where(model.updated_at > since).order_by(model.updated_at, model.id)
+  else:
+    query = query.order_by(model.id)
+  for batch in export_rows(query):
+    yield batch
+
+def export_rows(query):
+  result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+  for partition in result.partitions():
+    yield [tuple(row) for row in partition]
+
+def export_stream(kind, format, since=None):
+  # returns the report and the encoded chunks; the watermark is fixed before
+  # the first row is read, so the next export can start from it
+  model = EXPORTS[kind]
+  watermark = export_watermark(model) or since
+  report = exporter.ExportReport(kind, since, watermark)
+  batches = export_batches(model, since, watermark) if watermark is not None else iter(())
+  return report, exporter.run_export(report, export_columns(model), batches, format)
+
+@bp.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'format', type=click.Choice(exporter.FORMATS), help='Defaults to the file extension.')
+@click.option('--since', type=datetime.fromisoformat, help='Only rows changed after this watermark.')
+def export_command(kind, path, format, since):
+  """Dump venues, artists or shows to a CSV, JSONL, columnar or Parquet file."""
+  format = format or exporter.detect_format(path)
+  report, chunks = export_stream(kind, format, since)
+  with open(path, 'wb') as output:
+    for chunk in chunks:
+      output.write(chunk)
+  click.echo(str(report))
+
+@bp.route('/export/<any(venues, artists, shows):kind>')
+@read_only
+def export_download(kind):
+  format = request.args.get('format', 'jsonl')
+  if format not in exporter.FORMATS:
+    abort(400)
+  since = request.args.get('since')
+  try:
+    since = datetime.fromisoformat(since) if since else None
+  except ValueError:
+    abort(400)
+  try:
+    report, chunks = export_stream(kind, format, since)
+  except RuntimeError as e:
+    abort(501, str(e))
+  headers = {
+    "Content-Disposition": 'attachment; filename="%s%s"' % (kind, exporter.EXTENSIONS[format]),
+    "X-Export-Watermark": report.watermark.isoformat() if report.watermark else ''
+  }
+  return Response(stream_with_context(chunks), mimetype=exporter.MIMETYPES[format], headers=headers)
+
@@ -0,0 +1,289 @@
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import timezone
+
+from flask import Response, current_app, g, make_response, request, session
+
+# Read-through cache for rendered pages. Every key lives in a namespace
+# (e.g. "venue:3" or "venues"); invalidating a namespace swaps its version
+# token, which orphans every key written under the old one at once. Each
+# app has its own backend, TTL and counters, found through current_app.
+# For DATABASE_READ_YOUR_WRITES seconds after an invalidation, a page read
+# from a replica is served but not stored: the replica may not have replayed
+# the write yet, and the stale page would stay for the whole TTL.
+
+
+class NullBackend(object):
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryBackend(object):
+    # per-process LRU; invalidations only reach the worker that made them,
+    # other workers converge within the TTL
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class FileSystemBackend(object):
+    # shared between the workers of one host
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                value, expires = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires is not None and expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((value, expires), f)
+        os.replace(tmp, self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+
+
+class RedisBackend(object):
+
+    def __init__(self, url, prefix='fyyur:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND = "redis" requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class CacheState(object):
+    # one app's backend, TTL and counters
+
+    def __init__(self, backend, ttl, lag_window=0):
+        self.backend = backend
+        self.ttl = ttl
+        self.lag_window = lag_window
+        self.counts = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0, 'replica_skips': 0}
+
+
+def cache_backend(config):
+    kind = config.get('CACHE_BACKEND', 'memory')
+    if kind == 'memory':
+        return MemoryBackend(config.get('CACHE_MAX_ENTRIES', 1024))
+    if kind == 'filesystem':
+        return FileSystemBackend(config['CACHE_DIR'])
+    if kind == 'redis':
+        return RedisBackend(config['CACHE_REDIS_URL'])
+    if kind == 'null':
+        return NullBackend()
+    raise ValueError('Unknown CACHE_BACKEND %r' % kind)
+
+
+class PageCache(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['page_cache'] = CacheState(cache_backend(app.config), app.config.get('CACHE_TTL', 60),
+                                                  app.config.get('DATABASE_READ_YOUR_WRITES', 0))
+
+    @property
+    def state(self):
+        return current_app.extensions['page_cache']
+
+    def version(self, namespace):
+        backend = self.state.backend
+        version = backend.get('version:' + namespace)
+        if version is None:
+            version = uuid.uuid4().hex
+            backend.set('version:' + namespace, version)
+        return version
+
+    def key(self, namespace, suffix=''):
+        return '%s@%s:%s' % (namespace, self.version(namespace), suffix)
+
+    def get(self, key):
+        state = self.state
+        value = state.backend.get(key)
+        state.counts['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, key, value):
+        state = self.state
+        state.backend.set(key, value, state.ttl)
+        state.counts['sets'] += 1
+
+    def invalidate(self, *namespaces):
+        state = self.state
+        for namespace in namespaces:
+            state.backend.delete('version:' + namespace)
+            self.mark_written(state, namespace)
+            state.counts['invalidations'] += 1
+
+    def clear(self):
+        state = self.state
+        state.backend.clear()
+        # '*' stands for every namespace
+        self.mark_written(state, '*')
+        state.counts['invalidations'] += 1
+
+    def mark_written(self, state, namespace):
+        if state.lag_window:
+            state.backend.set('written:' + namespace, True, state.lag_window)
+
+    def replica_may_lag(self, namespace):
+        # the request read a replica while a write to namespace may still be
+        # replaying on it
+        if g.get('db_replica') is None:
+            return False
+        backend = self.state.backend
+        return backend.get('written:' + namespace) is not None or backend.get('written:*') is not None
+
+    def stats(self):
+        state = self.state
+        lookups = state.counts['hits'] + state.counts['misses']
+        stats = dict(state.counts)
+        stats['backend'] = type(state.backend).__name__
+        stats['hit_ratio'] = round(state.counts['hits'] / lookups, 4) if lookups else None
+        return stats
+
+    def cached(self, namespace):
+        # caches the rendered page of a GET view under namespace(**view_args),
+        # keyed by query string; requests carrying flashed messages bypass it
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**kwargs):
+                if request.method != 'GET' or session.get('_flashes'):
+                    return view(**kwargs)
+                # the key is resolved before rendering, so a page rendered
+                # from data that was invalidated meanwhile is stored orphaned;
+                # under conditional() it also carries the ETag, so a worker
+                # that missed the invalidation never serves an old body
+                # under a new ETag
+                name = namespace(**kwargs)
+                key = self.key(name, '%s#%s' % (request.query_string.decode(), g.get('page_etag', '')))
+                page = self.get(key)
+                if page is None:
+                    page = view(**kwargs)
+                    if isinstance(page, str):
+                        if self.replica_may_lag(name):
+                            self.state.counts['replica_skips'] += 1
+                        else:
+                            self.set(key, page)
+                return page
+            return wrapper
+        return decorator
+
+
+def conditional(validator):
+    # answers If-None-Match / If-Modified-Since before the view runs;
+    # validator(**view_args) returns (etag parts, last modified) or None.
+    # The ETag is left in g.page_etag for the page cache's key.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**kwargs)
+            validators = validator(**kwargs)
+            if validators is None:
+                return view(**kwargs)
+            parts, last_modified = validators
+            etag = g.page_etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+            if last_modified is not None:
+                # updated_at columns hold naive UTC
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+            if request.if_none_match:
+                fresh = request.if_none_match.contains(etag)
+            else:
+                fresh = last_modified is not None and request.if_modified_since is not None and \
+                    last_modified <= request.if_modified_since
+            response = Response(status=304) if fresh else make_response(view(**kwargs))
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
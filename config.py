@@ -1,13 +1,120 @@
 import os
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
 
-# Connect to the database
+def database_uri(uri):
+    # Heroku-style URLs use the postgres:// scheme SQLAlchemy no longer accepts
+    if uri and uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
 
+def flag(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
 
-# TODO IMPLEMENT DATABASE URL -- FINISHED
-SQLALCHEMY_DATABASE_URI = 'postgres://adrianabarca@localhost:5432/fyyurapp'
+
+# Sessions are signed with SECRET_KEY. Without one each process makes up its
+# own, and a cookie signed by one worker is unreadable to the next: fine for
+# the development server, not for production or read replicas, whose
+# read-your-writes window lives in the session. Both refuse to start.
+RANDOM_SECRET_KEY = os.urandom(32)
+
+
+# One class per environment; create_app() takes a name from CONFIGS, a class,
+# or defaults to FYYUR_ENV (development when unset).
+
+class Config(object):
+    SECRET_KEY = os.environ.get('SECRET_KEY') or RANDOM_SECRET_KEY
+
+    # Enable debug mode.
+    DEBUG = True
+
+    # Connect to the database
+
+    # TODO IMPLEMENT DATABASE URL -- FINISHED
+    SQLALCHEMY_DATABASE_URI = database_uri(os.environ.get('DATABASE_URL', 'postgresql://adrianabarca@localhost:5432/fyyurapp'))
+
+    # Optional read replicas (comma-separated) that read-only views query, picked
+    # per request 'round-robin' or 'least-loaded' (fewest checked-out connections
+    # in this worker). After a POST the visitor reads the primary for
+    # DATABASE_READ_YOUR_WRITES seconds; keep it above the replication lag.
+    DATABASE_REPLICA_URIS = [database_uri(uri) for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+    DATABASE_REPLICA_SELECTION = os.environ.get('DATABASE_REPLICA_SELECTION', 'round-robin')
+    DATABASE_READ_YOUR_WRITES = int(os.environ.get('DATABASE_READ_YOUR_WRITES', 5))
+
+    # Connection pool, per worker process: keep pool size + overflow times the
+    # number of workers below the server's max_connections.
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 5))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 5))
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', 10))
+    DATABASE_POOL_PRE_PING = flag(os.environ.get('DATABASE_POOL_PRE_PING', 'true'))
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', 1800))
+    # Milliseconds, PostgreSQL only; 0 disables it.
+    DATABASE_STATEMENT_TIMEOUT = int(os.environ.get('DATABASE_STATEMENT_TIMEOUT', 30000))
+    # Run the independent queries of a page (an entity and its shows, a search's
+    # count and results) concurrently on an asyncio engine: needs asyncpg or
+    # aiosqlite, and threaded (not gevent) workers.
+    DATABASE_ASYNC = flag(os.environ.get('DATABASE_ASYNC', 'false'))
+
+
+    # Page cache: 'memory' (per-worker LRU), 'filesystem', 'redis' or 'null' to disable.
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    CACHE_MAX_ENTRIES = 1024
+    CACHE_DIR = os.path.join(basedir, '.cache')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Templates: compiled bytecode shared by the workers on a host ('' to
+    # disable), every template loaded at worker startup, and whether workers
+    # re-check template files for changes; turn that off in production.
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(basedir, '.jinja_cache'))
+    TEMPLATE_WARMUP = flag(os.environ.get('TEMPLATE_WARMUP', 'true'))
+    TEMPLATES_AUTO_RELOAD = flag(os.environ.get('TEMPLATES_AUTO_RELOAD', 'true'))
+
+    # Per-request profiling: Server-Timing headers, a JSON log line per request
+    # and percentiles per endpoint on /_debug/profile. Off unless asked for.
+    PROFILE_REQUESTS = flag(os.environ.get('PROFILE_REQUESTS', 'false'))
+    PROFILE_SAMPLES = 1000
+    PROFILE_DUPLICATE_THRESHOLD = 2
+    # /_debug/profile, /_debug/pool and /_debug/cache answer 404 unless DEBUG,
+    # PROFILE_REQUESTS or this is on; they show SQL and internals to anyone.
+    DEBUG_ENDPOINTS = flag(os.environ.get('DEBUG_ENDPOINTS', 'false'))
+
+    # Rejected rows from uploads to /import/<kind>.
+    IMPORT_ERROR_DIR = os.path.join(basedir, 'import_errors')
+
+
+class DevelopmentConfig(Config):
+    pass
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # workers never re-check template files; a release restarts them
+    TEMPLATES_AUTO_RELOAD = flag(os.environ.get('TEMPLATES_AUTO_RELOAD', 'false'))
+
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = database_uri(os.environ.get('TEST_DATABASE_URL', 'sqlite://'))
+    CACHE_BACKEND = 'null'
+    TEMPLATE_WARMUP = False
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def config_object(config=None):
+    if config is None:
+        config = os.environ.get('FYYUR_ENV', 'development')
+    if isinstance(config, str):
+        if config not in CONFIGS:
+            raise ValueError('Unknown FYYUR_ENV %r' % config)
+        return CONFIGS[config]
+    return config
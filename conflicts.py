@@ -0,0 +1,207 @@
+import bisect
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import select, union_all, literal, values, column, func, and_, event, Integer, DateTime
+
+from database import RoutingSession
+from extensions import db
+from models import Venue, Artist, Show, MAX_SHOW_DURATION
+
+# A venue cannot hold two shows at once, and an artist cannot play two shows
+# at once. On PostgreSQL the exclusion constraints on
+# tsrange(start_time, end_time) enforce it within each partition of Show (see
+# partitions.py), and their GiST indexes answer the overlap lookups the write
+# path makes before inserting, so conflicts are reported per row instead of
+# failing the whole INSERT. No constraint spans two partitions, so a show
+# crossing into the next month is only checked by the write path: writers
+# hold a transaction-level advisory lock on each venue and artist of their
+# batch from the check until they commit, and never check concurrently.
+#
+# Other databases have no range index. There each process keeps the booked
+# intervals of the venues and artists it has written to in memory, loaded
+# from the Show table on first use, and checks new shows against them; the
+# lock makes check-then-insert atomic within the process. A commit that
+# updates or deletes shows, or deletes a venue or artist, drops them to be
+# reloaded. The fallback only sees other processes' writes once it reloads,
+# so it suits the single-process setups SQLite is used for: development and
+# the benchmarks.
+
+KEYS = (('venue_id', 'at the same venue'), ('artist_id', 'of the same artist'))
+# the first key of the two-key advisory locks, one per key column
+LOCK_CLASSES = {'venue_id': 0x46590001, 'artist_id': 0x46590002}
+
+class IntervalIndex(object):
+  # disjoint [start, end) intervals ordered by start. As none overlap, their
+  # ends are ordered too, so a new interval can only overlap the last one
+  # that starts before it ends: a check is one bisect, O(log n). Adding one
+  # shifts the lists, O(n), and merges it with the intervals it overlaps, so
+  # shows that already overlap in the table (booked before the checks, or by
+  # another process) keep the intervals disjoint; a merged interval is cited
+  # by its earliest show.
+
+  def __init__(self):
+    self.starts, self.ends, self.labels = [], [], []
+
+  def overlapping(self, start, end):
+    # the label of a booked interval overlapping [start, end), or None
+    position = bisect.bisect_left(self.starts, end)
+    if position and self.ends[position - 1] > start:
+      return self.labels[position - 1]
+    return None
+
+  def add(self, start, end, label):
+    position = bisect.bisect_left(self.starts, start)
+    if position and self.ends[position - 1] > start:
+      position -= 1
+      start, label = self.starts[position], self.labels[position]
+    last = position
+    while last < len(self.starts) and self.starts[last] < end:
+      end = max(end, self.ends[last])
+      last += 1
+    self.starts[position:last] = [start]
+    self.ends[position:last] = [end]
+    self.labels[position:last] = [label]
+
+indexes = {}
+# reentrant: a commit under exclusive() may forget()
+lock = threading.RLock()
+
+def in_memory():
+  return db.session.get_bind().dialect.name != 'postgresql'
+
+@contextmanager
+def exclusive(records):
+  # held from the conflict check until the batch is committed and remembered;
+  # on PostgreSQL the locks end with the transaction, so a batch that rolls
+  # back and is checked again takes them again
+  if in_memory():
+    with lock:
+      yield
+  else:
+    lock_entities(records)
+    yield
+
+def lock_entities(records):
+  # the advisory locks of the batch's venues and artists, taken in one order
+  # (venues, then artists, by id) so two writers cannot deadlock
+  keys = sorted({(LOCK_CLASSES[key], record[key]) for record in records for key, _ in KEYS})
+  if not keys:
+    return
+  locks = values(column('lock_class', Integer), column('id', Integer), name='locks').data(keys)
+  ordered = select(locks).order_by(locks.c.lock_class, locks.c.id).subquery()
+  db.session.execute(select(func.count(func.pg_advisory_xact_lock(ordered.c.lock_class, ordered.c.id))))
+
+def forget():
+  # drop the in-memory intervals, to be reloaded from the Show table
+  with lock:
+    indexes.clear()
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def note_bulk_change(state):
+  mapper = state.bind_mapper
+  if (state.is_update or state.is_delete) and mapper is not None and \
+      (mapper.class_ is Show or state.is_delete and mapper.class_ in (Venue, Artist)):
+    state.session.info['shows_changed'] = True
+
+@event.listens_for(RoutingSession, 'before_flush')
+def note_change(session, flush_context, instances):
+  if any(isinstance(target, Show) for target in session.dirty) or \
+      any(isinstance(target, (Show, Venue, Artist)) for target in session.deleted):
+    session.info['shows_changed'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def forget_changes(session):
+  if session.info.pop('shows_changed', False):
+    forget()
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def discard_changes(session):
+  session.info.pop('shows_changed', None)
+
+def cached_indexes(records):
+  # the IntervalIndex of every venue and artist in the batch, loading the
+  # missing ones with one query per key column
+  url = str(db.session.get_bind().url)
+  found = {}
+  for key, _ in KEYS:
+    missing = set()
+    for entity_id in {record[key] for record in records}:
+      if (url, key, entity_id) in indexes:
+        found[(key, entity_id)] = indexes[(url, key, entity_id)]
+      else:
+        missing.add(entity_id)
+    if not missing:
+      continue
+    for entity_id in missing:
+      found[(key, entity_id)] = indexes[(url, key, entity_id)] = IntervalIndex()
+    fk = getattr(Show, key)
+    rows = db.session.query(fk, Show.start_time, Show.end_time, Show.id).\
+      filter(fk.in_(missing)).order_by(Show.start_time)
+    for entity_id, start_time, end_time, show_id in rows:
+      found[(key, entity_id)].add(start_time, end_time, 'show %d' % show_id)
+  return lambda key, entity_id: found[(key, entity_id)]
+
+def booked_overlaps(records):
+  # {index: (key, show id)} for records overlapping a stored show, through
+  # the exclusion constraints' GiST indexes, one query for the batch
+  batch = values(column('row', Integer), column('venue_id', Integer), column('artist_id', Integer),
+    column('start_time', DateTime), column('end_time', DateTime), name='batch').\
+    data([(index, record['venue_id'], record['artist_id'], record['start_time'], record['end_time'])
+      for index, record in enumerate(records)])
+  span = func.tsrange(batch.c.start_time, batch.c.end_time)
+  # an overlapping show starts before the batch's last end, and no earlier
+  # than MAX_SHOW_DURATION before its first start: constant bounds, so only
+  # the partitions of the batch's months and their neighbours are searched
+  earliest = min(record['start_time'] for record in records) - MAX_SHOW_DURATION
+  latest = max(record['end_time'] for record in records)
+  query = union_all(*[
+    select(literal(key), batch.c.row, Show.id).select_from(batch).
+      join(Show, and_(getattr(Show, key) == batch.c[key], func.tsrange(Show.start_time, Show.end_time).op('&&')(span))).
+      where(Show.start_time > earliest, Show.start_time < latest)
+    for key, _ in KEYS])
+  overlaps = {}
+  for key, index, show_id in db.session.execute(query):
+    overlaps.setdefault(index, (key, 'show %d' % show_id))
+  return overlaps
+
+def overlapping(records, rows=None, noun='row'):
+  # {index: errors} for records overlapping a booked show or an earlier
+  # record of the batch; rows are the records' numbers in the caller's
+  # input, cited as '<noun> <number>' in the messages
+  rows = rows or range(len(records))
+  refused = {}
+  if in_memory():
+    booked = cached_indexes(records)
+  else:
+    booked = None
+    for index, (key, label) in booked_overlaps(records).items():
+      refused[index] = overlap_error(key, label)
+  pending = {}
+  for index, record in enumerate(records):
+    if index in refused:
+      continue
+    for key, _ in KEYS:
+      label = booked(key, record[key]).overlapping(record['start_time'], record['end_time']) if booked else None
+      label = label or pending.get((key, record[key]), IntervalIndex()).overlapping(record['start_time'], record['end_time'])
+      if label:
+        refused[index] = overlap_error(key, label)
+        break
+    else:
+      for key, _ in KEYS:
+        pending.setdefault((key, record[key]), IntervalIndex()).add(record['start_time'], record['end_time'], '%s %d' % (noun, rows[index]))
+  return refused
+
+def overlap_error(key, label):
+  return {"start_time": ["Overlaps %s %s." % (label, dict(KEYS)[key])]}
+
+def remember(records, ids):
+  # add committed shows to the in-memory intervals already loaded
+  if not in_memory():
+    return
+  url = str(db.session.get_bind().url)
+  for record, show_id in zip(records, ids):
+    for key, _ in KEYS:
+      index = indexes.get((url, key, record[key]))
+      if index is not None:
+        index.add(record['start_time'], record['end_time'], 'show %d' % show_id)
@@ -0,0 +1,217 @@
+import functools
+import itertools
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from config import RANDOM_SECRET_KEY
+
+# Engine setup: pool settings and the optional read replicas come from the
+# DATABASE_* settings in config.py, every queue pool records how long
+# checkouts wait, and views marked read_only run their queries on a replica
+# unless the visitor wrote something within the read-your-writes window.
+
+REPLICA_SELECTIONS = ('round-robin', 'least-loaded')
+
+
+def in_memory(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config, uri):
+    if in_memory(uri):
+        # Flask-SQLAlchemy pins in-memory SQLite to a single static connection
+        return {}
+    options = {
+        'poolclass': MeteredQueuePool,
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+        'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+        'pool_pre_ping': config['DATABASE_POOL_PRE_PING'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+    }
+    if config['DATABASE_STATEMENT_TIMEOUT'] and make_url(uri).get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': '-c statement_timeout=%d' % config['DATABASE_STATEMENT_TIMEOUT']}
+    return options
+
+
+def configure(config):
+    # fills in the Flask-SQLAlchemy engine settings; call before db.init_app(app)
+    options = engine_options(config, config['SQLALCHEMY_DATABASE_URI'])
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    if config.get('DATABASE_REPLICA_URIS'):
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        for key, uri in zip(replica_keys(config), config['DATABASE_REPLICA_URIS']):
+            replica = engine_options(config, uri)
+            replica['url'] = uri
+            binds[key] = replica
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def replica_keys(config):
+    return ['replica_%d' % number for number in range(1, len(config.get('DATABASE_REPLICA_URIS') or ()) + 1)]
+
+
+def init_app(app):
+    # call after db.init_app(app)
+    selection = app.config.get('DATABASE_REPLICA_SELECTION', 'round-robin')
+    if selection not in REPLICA_SELECTIONS:
+        raise ValueError('Unknown DATABASE_REPLICA_SELECTION %r' % selection)
+    if replica_keys(app.config) and app.config.get('SECRET_KEY') in (None, RANDOM_SECRET_KEY):
+        # the read-your-writes window is kept in the session; under a key made
+        # up per process the other workers cannot read it, and send a visitor
+        # who just wrote to a lagging replica
+        raise RuntimeError('DATABASE_REPLICA_URLS requires SECRET_KEY to be set')
+    app.extensions['replica_selector'] = ReplicaSelector(replica_keys(app.config), selection)
+    app.after_request(remember_write)
+
+
+class PoolMetrics(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_ms_total': round(self.wait_total * 1000, 3),
+                'wait_ms_avg': round(self.wait_total * 1000 / (self.checkouts + self.timeouts), 3)
+                if self.checkouts + self.timeouts else None,
+                'wait_ms_max': round(self.wait_max * 1000, 3),
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    # times every checkout, including the wait for a free connection when the
+    # pool and its overflow are exhausted
+
+    def __init__(self, *args, **kwargs):
+        super(MeteredQueuePool, self).__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super(MeteredQueuePool, self).connect()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # dispose() and invalidations swap in a fresh pool; keep the counts
+        pool = super(MeteredQueuePool, self).recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def pool_stats(engines):
+    stats = {}
+    for key, engine in engines.items():
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__, 'status': pool.status()}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'checked_in': pool.checkedin(),
+            })
+        if isinstance(pool, MeteredQueuePool):
+            entry.update(pool.metrics.as_dict())
+        stats[key or 'primary'] = entry
+    return stats
+
+
+class ReplicaSelector(object):
+
+    def __init__(self, keys, selection='round-robin'):
+        self.keys = keys
+        self.selection = selection
+        self.turns = itertools.count()
+
+    def choose(self, engines):
+        if not self.keys:
+            return None
+        # rotating the starting point spreads ties between equally loaded replicas
+        start = next(self.turns) % len(self.keys)
+        keys = self.keys[start:] + self.keys[:start]
+        if self.selection == 'least-loaded':
+            return min(keys, key=lambda key: checked_out(engines[key]))
+        return keys[0]
+
+
+def checked_out(engine):
+    return engine.pool.checkedout() if isinstance(engine.pool, QueuePool) else 0
+
+
+class RoutingSession(Session):
+    # inside a read_only view, queries go to the replica picked for the
+    # request; flushes always go to the primary
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            replica = request_replica(self._db.engines)
+            if replica is not None:
+                return self._db.engines[replica]
+        return super(RoutingSession, self).get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def request_replica(engines):
+    # the key of the replica this request reads, or None for the primary
+    if not (has_app_context() and g.get('read_replica')):
+        return None
+    if 'db_replica' not in g:
+        # one replica per request, so its queries read one snapshot
+        g.db_replica = current_app.extensions['replica_selector'].choose(engines)
+    return g.db_replica
+
+
+def recently_wrote():
+    window = current_app.config.get('DATABASE_READ_YOUR_WRITES', 0)
+    wrote_at = session.get('db_wrote_at')
+    return wrote_at is not None and time.time() - wrote_at < window
+
+
+def route_reads():
+    # a visitor who just wrote reads the primary until the window passes, so a
+    # redirect after a POST never shows what the replica has not replayed yet
+    g.read_replica = not recently_wrote()
+
+
+def remember_write(response):
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and 'read_replica' not in g \
+            and current_app.extensions['replica_selector'].keys:
+        session['db_wrote_at'] = time.time()
+    return response
+
+
+def read_only(view):
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        route_reads()
+        return view(**kwargs)
+    return wrapper
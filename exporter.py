@@ -0,0 +1,187 @@
+import csv
+import io
+import time
+from datetime import date, datetime
+
+import serializers
+
+# Streaming bulk export: rows arrive in batches from a server-side cursor and
+# each batch is encoded and handed on before the next one is fetched, so
+# memory stays flat however large the table is.
+
+FORMATS = ('csv', 'jsonl', 'columnar', 'parquet')
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'columnar': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+EXTENSIONS = {
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'columnar': '.columns.jsonl',
+    'parquet': '.parquet',
+}
+
+
+def detect_format(filename):
+    for format in ('columnar', 'csv', 'jsonl', 'parquet'):
+        if filename.lower().endswith(EXTENSIONS[format]):
+            return format
+    raise ValueError('Cannot tell the format of %s, pass one of %s explicitly' % (filename, ', '.join(FORMATS)))
+
+
+def csv_value(value):
+    # written so that importer.read_rows reads the file back: genres as a
+    # comma-separated list, booleans as the values BooleanField accepts
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return ','.join(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in columns])
+    yield buffer.getvalue().encode()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+
+
+def jsonl_chunks(columns, batches):
+    keys = [column.key for column in columns]
+    for batch in batches:
+        yield ''.join(serializers.dumps(dict(zip(keys, row))) + '\n' for row in batch).encode()
+
+
+def columnar_chunks(columns, batches):
+    # one JSON object of column arrays per batch, i.e. a row group
+    keys = [column.key for column in columns]
+    for batch in batches:
+        yield (serializers.dumps(dict(zip(keys, map(list, zip(*batch))))) + '\n').encode()
+
+
+class ChunkSink(io.RawIOBase):
+    # write-only file that hands its bytes back to the generator reading it
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        del self.chunks[:]
+        return data
+
+
+def arrow_schema(pa, columns):
+    types = {int: pa.int64(), str: pa.string(), bool: pa.bool_(), datetime: pa.timestamp('us'),
+             list: pa.list_(pa.string())}
+    return pa.schema([(column.key, types[column.type.python_type]) for column in columns])
+
+
+def pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('The parquet export format requires the pyarrow package')
+    return pyarrow, pyarrow.parquet
+
+
+def parquet_chunks(columns, batches):
+    # every batch becomes a Parquet row group
+    pa, pq = pyarrow()
+    schema = arrow_schema(pa, columns)
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    for batch in batches:
+        writer.write_table(pa.Table.from_pydict(
+            {column.key: list(values) for column, values in zip(columns, zip(*batch))}, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    'csv': csv_chunks,
+    'jsonl': jsonl_chunks,
+    'columnar': columnar_chunks,
+    'parquet': parquet_chunks,
+}
+
+
+class ExportReport(object):
+
+    def __init__(self, kind, since, watermark):
+        self.kind = kind
+        self.since = since
+        self.watermark = watermark
+        self.rows = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'since': self.since.isoformat() if self.since else None,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'rows': self.rows,
+            'batches': self.batches,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rate, 1),
+        }
+
+    def __str__(self):
+        return ('Exported %(rows)d %(kind)s in %(batches)d batches over %(seconds).2fs '
+                '(%(rows_per_second).0f rows/s), watermark %(watermark)s' % self.as_dict())
+
+
+def run_export(report, columns, batches, format):
+    # returns a generator of UTF-8 / Parquet bytes; the report counts rows as
+    # the batches go through. Errors are raised here, before anything streams.
+    if format not in ENCODERS:
+        raise ValueError('Unknown export format %r' % format)
+    if format == 'parquet':
+        pyarrow()
+
+    def counted():
+        for batch in batches:
+            report.rows += len(batch)
+            report.batches += 1
+            yield batch
+            report.elapsed = time.perf_counter() - report.started
+
+    def encoded():
+        for chunk in ENCODERS[format](columns, counted()):
+            yield chunk
+        report.elapsed = time.perf_counter() - report.started
+
+    return encoded()
@@ -0,0 +1,16 @@
+from flask_moment import Moment
+from flask_sqlalchemy import SQLAlchemy
+
+import database
+from asyncdb import AsyncDatabase
+from cache import PageCache
+from profiler import Profiler
+
+# The extensions are created unbound so models and views can import them;
+# create_app() binds them to each app it builds.
+
+db = SQLAlchemy(session_options={'class_': database.RoutingSession})
+async_db = AsyncDatabase()
+moment = Moment()
+page_cache = PageCache()
+profiler = Profiler()
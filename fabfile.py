@@ -1,3 +1,6 @@
+import glob
+import os
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
@@ -5,14 +8,46 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    # runs every benchmark once against the local benchmark database
+    with settings(warn_only=True):
+        result = local("python -m pytest benchmarks -q --benchmark-disable", capture=True)
+    if result.failed and not confirm("Tests failed. Continue?"):
+        abort("Aborted at user request.")
+
+
+def latest_baseline():
+    # machine/id of the newest run baseline() saved, e.g. Linux-CPython-3.11-64bit/0004_baseline
+    saved = glob.glob(os.path.join('.benchmarks', '*', '[0-9][0-9][0-9][0-9]_baseline.json'))
+    if not saved:
+        abort("No saved baseline: run `fab baseline` first.")
+    path = max(saved, key=os.path.getmtime)
+    return '%s/%s' % (os.path.basename(os.path.dirname(path)), os.path.splitext(os.path.basename(path))[0])
+
+
+def benchmark():
+    # compares against the saved baseline, not the previous run, so slow
+    # drift still trips the gate; every run is saved for the history
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m pytest benchmarks --benchmark-autosave "
+            "--benchmark-compare={} --benchmark-compare-fail=median:20%".format(latest_baseline()), capture=True
         )
-    if result.failed and not confirm("Tests failed. Continue?"):
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
         abort("Aborted at user request.")
 
 
+def boot():
+    # worker import and startup time against BOOT_BUDGET_MS
+    with settings(warn_only=True):
+        result = local("python -m benchmarks.boot --config production --imports 15", capture=True)
+    if result.failed and not confirm("Worker boot is over budget. Continue?"):
+        abort("Aborted at user request.")
+
+
+def baseline():
+    local("python -m pytest benchmarks --benchmark-save=baseline")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -24,6 +59,7 @@ def push():
 
 def prepare():
     test()
+    boot()
     commit()
     push()
 
@@ -39,8 +75,9 @@ def heroku():
 
 
 def heroku_test():
+    # a small seeded SQLite file on the dyno, never the app's database
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run BENCH_SHOWS=20000 python -m pytest benchmarks -q --benchmark-disable"
     )
 
 
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, tuple_, func
+
+from extensions import db, page_cache
+from models import Venue, Artist, Show, UpcomingShow
+
+# The upcoming shows feed ("this week" / "this month", by city) reads
+# UpcomingShow only. The write path keeps it current as shows are booked:
+# new shows starting within FEED_HORIZON are copied in by the same
+# transaction, a deleted venue's shows leave with it, and venue and artist
+# edits are copied to their rows. Shows that have started are skipped when
+# read. `flask feed refresh`, run periodically, drops them and adds the
+# shows that time has brought within the horizon; the horizon is wider than
+# the longest range so a run every hour (or day) keeps every range complete.
+# The refresh is one transaction, which readers never wait for.
+
+FEED_RANGES = {'week': 7, 'month': 30}
+FEED_HORIZON = timedelta(days=45)
+FEED_PAGE_SIZE = 48
+
+FEED_COLUMNS = ['show_id', 'start_time', 'venue_id', 'venue_name', 'venue_image_link', 'venue_timezone',
+  'city', 'state', 'artist_id', 'artist_name', 'artist_image_link']
+
+def feed_source(now):
+  # the feed rows of the shows starting within the horizon, from Show
+  return select(Show.id, Show.start_time, Show.venue_id, Venue.name, Venue.image_link, Venue.timezone,
+    Venue.city, Venue.state, Show.artist_id, Artist.name, Artist.image_link).\
+    join(Venue, Show.venue_id == Venue.id).\
+    join(Artist, Show.artist_id == Artist.id).\
+    where(Show.start_time >= now, Show.start_time < now + FEED_HORIZON)
+
+def copy_in(query):
+  return db.session.execute(UpcomingShow.__table__.insert().from_select(FEED_COLUMNS, query)).rowcount
+
+def add_shows(records, ids, now=None):
+  # copies the new shows that start within the horizon into the feed;
+  # returns how many, so callers know whether the feed pages changed
+  now = now or datetime.now()
+  upcoming = [show_id for record, show_id in zip(records, ids) if now <= record['start_time'] < now + FEED_HORIZON]
+  if upcoming:
+    copy_in(feed_source(now).where(Show.id.in_(upcoming)))
+  return len(upcoming)
+
+def remove_venue(venue_id):
+  UpcomingShow.query.filter(UpcomingShow.venue_id == venue_id).delete(synchronize_session=False)
+
+def update_venue(venue):
+  UpcomingShow.query.filter(UpcomingShow.venue_id == venue.id).update({
+    UpcomingShow.venue_name: venue.name,
+    UpcomingShow.venue_image_link: venue.image_link,
+    UpcomingShow.venue_timezone: venue.timezone,
+    UpcomingShow.city: venue.city,
+    UpcomingShow.state: venue.state}, synchronize_session=False)
+
+def update_artist(artist):
+  UpcomingShow.query.filter(UpcomingShow.artist_id == artist.id).update({
+    UpcomingShow.artist_name: artist.name,
+    UpcomingShow.artist_image_link: artist.image_link}, synchronize_session=False)
+
+def refresh_feed(now=None, full=False):
+  # drops the shows that have started (every row with full) and copies in
+  # the shows within the horizon that are missing; returns (removed, added)
+  now = now or datetime.now()
+  removed = UpcomingShow.query
+  if not full:
+    removed = removed.filter(UpcomingShow.start_time < now)
+  removed = removed.delete(synchronize_session=False)
+  listed = select(UpcomingShow.show_id).where(UpcomingShow.show_id == Show.id).exists()
+  added = copy_in(feed_source(now).where(~listed))
+  db.session.commit()
+  page_cache.invalidate('feed')
+  return removed, added
+
+def upcoming_feed(days, city=None, state=None, after=None, now=None):
+  # the feed's shows within `days`, soonest first, optionally in one city,
+  # after a (start_time, show_id) cursor
+  now = now or datetime.now()
+  query = UpcomingShow.query.filter(UpcomingShow.start_time >= now,
+    UpcomingShow.start_time < now + timedelta(days=days))
+  if city:
+    query = query.filter(UpcomingShow.city == city)
+  if state:
+    query = query.filter(UpcomingShow.state == state)
+  if after:
+    query = query.filter(tuple_(UpcomingShow.start_time, UpcomingShow.show_id) > after)
+  return query.order_by(UpcomingShow.start_time, UpcomingShow.show_id)
+
+def feed_cities(days, now=None):
+  # (city, state, shows) with upcoming shows within `days`, busiest first
+  now = now or datetime.now()
+  shows = func.count(UpcomingShow.show_id)
+  return db.session.query(UpcomingShow.city, UpcomingShow.state, shows).\
+    filter(UpcomingShow.start_time >= now, UpcomingShow.start_time < now + timedelta(days=days)).\
+    group_by(UpcomingShow.city, UpcomingShow.state).\
+    order_by(shows.desc(), UpcomingShow.city, UpcomingShow.state).all()
+
+feed = AppGroup('feed', help='Maintain the upcoming shows feed.')
+
+@feed.command('refresh')
+@click.option('--full', is_flag=True, help='Rebuild every row, e.g. after editing venues or artists in SQL.')
+def feed_refresh(full):
+  """Drop started shows from the feed and add the ones now within its horizon."""
+  removed, added = refresh_feed(full=full)
+  click.echo('Removed %d shows from the feed, added %d.' % (removed, added))
@@ -0,0 +1,49 @@
+import functools
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# The `datetime` Jinja filter. Views hand it real datetimes; the babel
+# pattern and locale for each (format, locale) pair are parsed once per
+# process instead of on every call. Show times are stored as naive venue
+# wall-clock times, so with a venue timezone a naive value is labelled with
+# that zone (not shifted), while an aware value is converted into it. babel
+# and dateutil are imported on first use rather than at worker startup.
+
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_pattern(format, locale, zoned):
+    import babel.dates
+    from babel.core import Locale
+    pattern = FORMATS.get(format, format)
+    if zoned:
+        pattern += ' z'
+    return babel.dates.parse_pattern(pattern), Locale.parse(locale or babel.dates.LC_TIME)
+
+
+@functools.lru_cache(maxsize=None)
+def zone(name):
+    # None for an empty or unknown name, so a bad value renders without a zone
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def format_datetime(value, format='medium', timezone=None, locale=None):
+    if value is None:
+        return ''
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    tzinfo = zone(timezone)
+    if tzinfo is not None:
+        value = value.replace(tzinfo=tzinfo) if value.tzinfo is None else value.astimezone(tzinfo)
+    pattern, locale = compiled_pattern(format, locale, value.tzinfo is not None)
+    return pattern.apply(value, locale)
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import time
+
+from werkzeug.datastructures import MultiDict
+
+# Streaming bulk import: rows are read, validated and written one batch at a
+# time, so memory stays flat however large the file is.
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename):
+    if filename.lower().endswith('.csv'):
+        return 'csv'
+    if filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    raise ValueError('Cannot tell the format of %s, pass csv or jsonl explicitly' % filename)
+
+
+def read_rows(stream, format):
+    # yields (line number, row dict) from a text stream
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, {'__invalid__': str(e)}
+                continue
+            yield line_number, row if isinstance(row, dict) else {'__invalid__': 'not an object'}
+    else:
+        raise ValueError('Unknown import format %r' % format)
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8', newline='')
+
+
+def formdata(row, multiple=()):
+    # builds form input the way a browser would post it: booleans become
+    # checkbox values, list fields (or comma-separated strings) repeat a key
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None or value is False:
+            continue
+        if value is True:
+            data[key] = 'y'
+        elif key in multiple:
+            values = value if isinstance(value, list) else str(value).split(',')
+            data.setlist(key, [str(v).strip() for v in values if str(v).strip()])
+        else:
+            data[key] = str(value)
+    return data
+
+
+def validate_with(form_class, row, multiple=()):
+    # returns (form.data, None) or (None, errors) using the form's own validators
+    if '__invalid__' in row:
+        return None, {'row': [row['__invalid__']]}
+    form = form_class(formdata=formdata(row, multiple), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    return form.data, None
+
+
+class ImportReport(object):
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.accepted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.error_path = None
+
+    @property
+    def rate(self):
+        return (self.accepted + self.rejected) / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rate, 1),
+            'errors': self.error_path if self.rejected else None,
+        }
+
+    def __str__(self):
+        return ('Imported %(accepted)d %(kind)s, rejected %(rejected)d, in %(batches)d batches '
+                'over %(seconds).2fs (%(rows_per_second).0f rows/s)' % self.as_dict())
+
+
+class ErrorLog(object):
+    # rejected rows as JSONL; the file is only created once a row is rejected
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def write(self, line, row, errors):
+        if self.file is None:
+            self.file = open(self.path, 'w')
+        self.file.write(json.dumps({'line': line, 'row': row, 'errors': errors}, default=str) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def run_import(kind, rows, validate, write, error_path, batch_size=1000, progress=None):
+    # validate(row) -> (record, errors); write(records, lines) commits one
+    # batch and returns {index in batch: errors} for records it refused;
+    # lines are the records' line numbers, for its messages
+    report = ImportReport(kind)
+    report.error_path = error_path
+    errors = ErrorLog(error_path)
+    batch = []
+
+    def flush():
+        refused = write([record for _, _, record in batch], [line for line, _, _ in batch]) if batch else {}
+        for index, (line, row, _) in enumerate(batch):
+            if index in refused:
+                errors.write(line, row, refused[index])
+        report.accepted += len(batch) - len(refused)
+        report.rejected += len(refused)
+        report.batches += 1
+        del batch[:]
+        report.elapsed = time.perf_counter() - report.started
+        if progress:
+            progress(report)
+
+    try:
+        for line, row in rows:
+            record, row_errors = validate(row)
+            if row_errors:
+                errors.write(line, row, row_errors)
+                report.rejected += 1
+                continue
+            batch.append((line, row, record))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        errors.close()
+        report.elapsed = time.perf_counter() - report.started
+    return report
@@ -0,0 +1,35 @@
+from flask import Blueprint, render_template, request, jsonify
+
+import database
+from extensions import db, page_cache, profiler
+
+bp = Blueprint('main', __name__)
+# query timings, SQL, pool state and cache counters: create_app() only
+# registers these when debugging, profiling or DEBUG_ENDPOINTS is on
+debug_bp = Blueprint('debug', __name__)
+
+@bp.route('/')
+def index():
+  return render_template('pages/home.html')
+
+@debug_bp.route('/_debug/cache')
+def cache_stats():
+  return jsonify(page_cache.stats())
+
+@debug_bp.route('/_debug/pool')
+def pool_stats():
+  return jsonify(database.pool_stats(db.engines))
+
+@debug_bp.route('/_debug/profile')
+def profile_stats():
+  if request.args.get('format') == 'json':
+    return jsonify(profiler.stats())
+  return render_template('pages/profile.html', enabled=profiler.enabled, endpoints=profiler.stats())
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
@@ -0,0 +1,52 @@
+"""add Show.end_time and exclude overlapping shows per venue and per artist
+
+Revision ID: a7d3e9c15b26
+Revises: f2b8c4d61a07
+Create Date: 2026-10-18 22:41:37.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9c15b26'
+down_revision = 'f2b8c4d61a07'
+branch_labels = None
+depends_on = None
+
+KEYS = ['venue_id', 'artist_id']
+
+
+def upgrade():
+    # a show without a start time can be neither checked nor listed, and the
+    # counters never counted it: drop those rows, then require start_time
+    op.execute('DELETE FROM "Show" WHERE start_time IS NULL')
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # existing shows get the default two hours (scheduling.SHOW_DURATION)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('''UPDATE "Show" SET end_time = start_time + interval '2 hours' ''')
+    else:
+        op.execute('''UPDATE "Show" SET end_time = datetime(start_time, '+2 hours')''')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # shows booked before this revision may already overlap: the constraints
+    # then fail to build and the upgrade rolls back, listing a conflicting
+    # pair. Move or delete those shows and run it again.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for key in KEYS:
+        op.execute(
+            'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_%(key)s_time" EXCLUDE USING gist '
+            '(%(key)s WITH =, tsrange(start_time, end_time) WITH &&)' % {'key': key})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for key in KEYS:
+            op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_%s_time"' % key)
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('end_time')
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,29 @@
+"""index the venue listing on its NULL-safe order
+
+Revision ID: b3f9d2c7e815
+Revises: e9b5d1a3f472
+Create Date: 2026-10-20 10:41:06.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f9d2c7e815'
+down_revision = 'e9b5d1a3f472'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /venues sorts a missing city, state or name as '' (queries.venue_order)
+    op.drop_index('ix_Venue_city_state_name_id', table_name='Venue')
+    op.create_index('ix_Venue_listing', 'Venue', [
+        sa.text("coalesce(city, '')"), sa.text("coalesce(state, '')"), sa.text("coalesce(name, '')"), 'id'],
+        unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_listing', table_name='Venue')
+    op.create_index('ix_Venue_city_state_name_id', 'Venue', ['city', 'state', 'name', 'id'], unique=False)
@@ -0,0 +1,107 @@
+"""partition Show by month of start_time (PostgreSQL)
+
+Revision ID: c4e8a2f67d19
+Revises: a7d3e9c15b26
+Create Date: 2026-10-19 09:27:52.316840
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f67d19'
+down_revision = 'a7d3e9c15b26'
+branch_labels = None
+depends_on = None
+
+# months after the current one that get their own partition, as
+# `flask partitions maintain` does by default
+AHEAD_MONTHS = 12
+KEYS = ['venue_id', 'artist_id']
+INDEXES = [('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+           ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+           ('ix_Show_start_time', ['start_time']),
+           ('ix_Show_updated_at', ['updated_at'])]
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def exclude_overlaps(table):
+    for key in KEYS:
+        op.execute(
+            'ALTER TABLE "%(table)s" ADD CONSTRAINT "ex_%(table)s_%(key)s_time" EXCLUDE USING gist '
+            '(%(key)s WITH =, tsrange(start_time, end_time) WITH &&)' % {'table': table, 'key': key})
+
+
+def move_show_table(**kw):
+    # renames Show out of the way, keeping its id sequence, and creates the
+    # new Show; keys, indexes and constraints come once the rows are in
+    op.rename_table('Show', 'Show_old')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+    op.create_table('Show',
+    sa.Column('id', sa.Integer(), server_default=sa.text('nextval(\'"Show_id_seq"\'::regclass)'), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    **kw
+    )
+
+
+def copy_show_table(primary_key):
+    # copies the rows into the new Show, drops the old table with its
+    # indexes and constraints, and builds them on the new one
+    op.execute('INSERT INTO "Show" SELECT id, start_time, end_time, venue_id, artist_id, updated_at FROM "Show_old"')
+    op.drop_table('Show_old')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.create_primary_key('Show_pkey', 'Show', primary_key)
+    op.create_foreign_key('Show_venue_id_fkey', 'Show', 'Venue', ['venue_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('Show_artist_id_fkey', 'Show', 'Artist', ['artist_id'], ['id'], ondelete='CASCADE')
+    for name, columns in INDEXES:
+        op.create_index(name, 'Show', columns, unique=False)
+
+
+def upgrade():
+    # Show is rebuilt partitioned, which locks it and rewrites every row: run
+    # it in a maintenance window. Other databases keep the plain table.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    oldest = op.get_bind().execute(sa.text('SELECT min(start_time) FROM "Show"')).scalar()
+    this_month = month_start(datetime.now())
+    move_show_table(postgresql_partition_by='RANGE (start_time)')
+    # a partition per month from the oldest show's to AHEAD_MONTHS ahead, and
+    # Show_rest after that, as partitions.py lays them out
+    month, until = month_start(min(oldest or this_month, this_month)), add_months(this_month, AHEAD_MONTHS + 1)
+    tables = []
+    while month < until:
+        tables.append('Show_y%04dm%02d' % (month.year, month.month))
+        op.execute('CREATE TABLE "%s" PARTITION OF "Show" FOR VALUES FROM (\'%s\') TO (\'%s\')' % (
+            tables[-1], month.isoformat(' '), add_months(month, 1).isoformat(' ')))
+        month = add_months(month, 1)
+    tables.append('Show_rest')
+    op.execute('CREATE TABLE "Show_rest" PARTITION OF "Show" FOR VALUES FROM (\'%s\') TO (MAXVALUE)' % (
+        until.isoformat(' ')))
+    # fails on shows without a start_time, which no partition takes
+    copy_show_table(['id', 'start_time'])
+    for table in tables:
+        exclude_overlaps(table)
+
+
+def downgrade():
+    # back to one table; months archived to another schema stay there
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    move_show_table()
+    copy_show_table(['id'])
+    exclude_overlaps('Show')
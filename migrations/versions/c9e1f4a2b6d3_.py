@@ -0,0 +1,29 @@
+"""cap a show's duration, so overlap checks only search neighbouring months
+
+Revision ID: c9e1f4a2b6d3
+Revises: b3f9d2c7e815
+Create Date: 2026-10-21 09:12:44.503817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e1f4a2b6d3'
+down_revision = 'b3f9d2c7e815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # models.MAX_SHOW_DURATION; the write path checks it on other databases.
+    # Shows booked longer than that make the upgrade fail: shorten them and
+    # run it again.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_check_constraint('ck_Show_duration', 'Show', "end_time - start_time <= interval '86400 seconds'")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('ck_Show_duration', 'Show', type_='check')
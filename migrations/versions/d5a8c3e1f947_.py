@@ -0,0 +1,32 @@
+"""record deleted venues, artists and shows for incremental exports
+
+Revision ID: d5a8c3e1f947
+Revises: c9e1f4a2b6d3
+Create Date: 2026-10-21 15:03:27.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8c3e1f947'
+down_revision = 'c9e1f4a2b6d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=32), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_Tombstone_table_name_deleted_at', 'Tombstone', ['table_name', 'deleted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Tombstone_table_name_deleted_at', table_name='Tombstone')
+    op.drop_table('Tombstone')
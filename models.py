@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, event, select, literal, literal_column, DDL
+
+import partitions
+import search
+from choices import GENRES
+from extensions import db
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    website_link = db.Column(db.String(120))
+    facebook_link = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(120))
+    # IANA zone name; show times at the venue are local wall-clock times in it
+    timezone = db.Column(db.String(64))
+    shows = db.relationship('Show', backref='Venue', lazy=True)
+    past_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    future_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    genres = db.Column(db.ARRAY(db.String).with_variant(db.JSON, 'sqlite'))
+    search_text = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now(), index=True)
+
+    __table_args__ = (
+      db.Index('ix_Venue_search_text', 'search_text', postgresql_using='gin',
+               postgresql_ops={'search_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+      # the /venues keyset order (see queries.venue_order); a genre-filtered page walks
+      # it and probes VenueGenre
+      db.Index('ix_Venue_listing', *[func.coalesce(column, literal_column("''")) for column in (city, state, name)], id),
+    )
+
+    # FINISHED: implement any missing fields, as a database migration using Flask-Migrate
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.Column(db.ARRAY(db.String).with_variant(db.JSON, 'sqlite'))
+    image_link = db.Column(db.String(500))
+    website_link = db.Column(db.String(120))
+    facebook_link = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(120))
+    shows = db.relationship('Show', backref="Artist", lazy=True)
+    past_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    future_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    search_text = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now(), index=True)
+
+    __table_args__ = (
+      db.Index('ix_Artist_search_text', 'search_text', postgresql_using='gin',
+               postgresql_ops={'search_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
+    # FINISHED: implement any missing fields, as a database migration using Flask-Migrate
+
+# FINISHED Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+# A venue holds one show at a time and an artist plays one show at a time.
+# On PostgreSQL that is enforced by exclusion constraints over
+# tsrange(start_time, end_time), whose GiST indexes (with btree_gist for the
+# integer column) make each check O(log n); conflicts.py checks it elsewhere.
+# There the table is also partitioned by month of start_time, with
+# (id, start_time) as its primary key and the exclusion constraints on each
+# partition (see partitions.py); the ORM still identifies shows by id.
+# No show lasts longer than MAX_SHOW_DURATION, so a show overlapping
+# [start, end) starts after start - MAX_SHOW_DURATION and an overlap check
+# only reads the neighbouring months.
+MAX_SHOW_DURATION = timedelta(hours=24)
+
+class Show(db.Model):
+  __tablename__ = 'Show'
+  __table_args__ = (
+    db.PrimaryKeyConstraint('id', name='Show_pkey').ddl_if(callable_=partitions.unpartitioned),
+    db.CheckConstraint("end_time - start_time <= interval '%d seconds'" % MAX_SHOW_DURATION.total_seconds(),
+                       name='ck_Show_duration').ddl_if(dialect='postgresql'),
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_Show_start_time', 'start_time'),
+    {'postgresql_partition_by': 'RANGE (start_time)'},
+  )
+  id = db.Column(db.Integer)
+  start_time = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+  end_time = db.Column(db.DateTime(), nullable=False)
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'))
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'))
+  updated_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                         server_default=func.now(), index=True)
+
+# The upcoming shows feed: the shows starting within feed.FEED_HORIZON, with
+# the venue and artist columns the feed renders copied in, so a feed page is
+# one range scan of the (city, state, start_time) index. The write path and
+# `flask feed refresh` keep it current (see feed.py).
+class UpcomingShow(db.Model):
+  __tablename__ = 'UpcomingShow'
+  __table_args__ = (
+    db.Index('ix_UpcomingShow_city_state_start_time', 'city', 'state', 'start_time', 'show_id'),
+    db.Index('ix_UpcomingShow_start_time', 'start_time', 'show_id'),
+  )
+  show_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  start_time = db.Column(db.DateTime(), nullable=False)
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False, index=True)
+  venue_name = db.Column(db.String)
+  venue_image_link = db.Column(db.String(500))
+  venue_timezone = db.Column(db.String(64))
+  city = db.Column(db.String(120))
+  state = db.Column(db.String(120))
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False, index=True)
+  artist_name = db.Column(db.String)
+  artist_image_link = db.Column(db.String(500))
+
+# past_count/future_count split shows at CounterRollover.rolled_at rather than
+# at "now"; `flask counters rollover` advances it and moves the shows in between.
+class CounterRollover(db.Model):
+  __tablename__ = 'CounterRollover'
+  id = db.Column(db.Integer, primary_key=True)
+  rolled_at = db.Column(db.DateTime(), nullable=False)
+
+# The ids of the venues, artists and shows the app deleted, so incremental
+# exports can pass the deletes on (see bulk.export_batches).
+class Tombstone(db.Model):
+  __tablename__ = 'Tombstone'
+  __table_args__ = (
+    db.Index('ix_Tombstone_table_name_deleted_at', 'table_name', 'deleted_at'),
+  )
+  id = db.Column(db.Integer, primary_key=True)
+  table_name = db.Column(db.String(32), nullable=False)
+  entity_id = db.Column(db.Integer, nullable=False)
+  deleted_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+
+# Genres are normalized into Genre and the VenueGenre/ArtistGenre association
+# tables, whose (genre_id, venue_id/artist_id) indexes serve genre filters.
+# The genres arrays stay on Venue and Artist as the copy pages display.
+class Genre(db.Model):
+  __tablename__ = 'Genre'
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String(120), nullable=False, unique=True)
+
+venue_genres = db.Table('VenueGenre',
+  db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+  db.Index('ix_VenueGenre_genre_id_venue_id', 'genre_id', 'venue_id'))
+
+artist_genres = db.Table('ArtistGenre',
+  db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+  db.Index('ix_ArtistGenre_genre_id_artist_id', 'genre_id', 'artist_id'))
+
+GENRE_ASSOCIATIONS = {
+  Venue: (venue_genres, 'venue_id'),
+  Artist: (artist_genres, 'artist_id')
+}
+
+@event.listens_for(Genre.__table__, 'after_create')
+def seed_genres(target, connection, **kw):
+  connection.execute(target.insert(), [{"name": genre} for genre in GENRES])
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+@event.listens_for(Artist, 'before_insert')
+@event.listens_for(Artist, 'before_update')
+def update_search_text(mapper, connection, target):
+  target.search_text = search.search_document(target.name, target.city, target.state, target.genres)
+
+@event.listens_for(Venue, 'after_insert')
+@event.listens_for(Venue, 'after_update')
+@event.listens_for(Artist, 'after_insert')
+@event.listens_for(Artist, 'after_update')
+def update_genre_links(mapper, connection, target):
+  if not db.inspect(target).attrs.genres.history.has_changes():
+    return
+  association, key = GENRE_ASSOCIATIONS[type(target)]
+  connection.execute(association.delete().where(association.c[key] == target.id))
+  if target.genres:
+    connection.execute(association.insert().from_select([key, 'genre_id'],
+      select(literal(target.id), Genre.id).where(Genre.name.in_(target.genres))))
+
+genre_ids = {}
+
+def genre_id(name):
+  # Genre is reference data seeded from choices.GENRES; its ids are read once
+  if not genre_ids:
+    genre_ids.update(db.session.query(Genre.name, Genre.id))
+  return genre_ids.get(name)
+
+def genre_members(model, genre):
+  # ids of the venues (or artists) tagged with a genre, read off the
+  # association table's (genre_id, id) index; the genre id goes in as a
+  # literal so the planner can use its frequency in the statistics
+  association, key = GENRE_ASSOCIATIONS[model]
+  return select(association.c[key]).where(association.c.genre_id == literal(genre_id(genre), literal_execute=True))
+
+search.install(db.metadata, Venue, Artist)
+event.listen(db.metadata, 'before_create',
+  DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+partitions.install(Show.__table__)
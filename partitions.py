@@ -0,0 +1,159 @@
+import re
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, event, text
+
+from extensions import db
+
+# On PostgreSQL, Show is range-partitioned on start_time: one partition per
+# calendar month ("Show_y2024m05") and "Show_rest" for everything after the
+# newest month. Queries bounded on start_time (either half of a detail page,
+# the listing cursors, the counter rollover window) only scan the months they
+# can match, and ordered by start_time they read the months in order and stop
+# at their LIMIT. `flask partitions maintain` splits months off Show_rest
+# ahead of time and moves months older than the retention window out of Show
+# into an archive schema.
+#
+# PostgreSQL wants start_time in the primary key of a partitioned table, and
+# keeps exclusion constraints (the overlap rules of conflicts.py) within one
+# partition: a show running past midnight at the end of a month is checked
+# against the next month's shows by the write path only, which holds
+# advisory locks on the batch's venues and artists (conflicts.exclusive()).
+#
+# Other databases get a plain table.
+
+TAIL = 'Show_rest'
+ARCHIVE_SCHEMA = 'archive'
+AHEAD_MONTHS = 12
+MONTH_PARTITION = re.compile(r'^Show_y(\d{4})m(\d{2})$')
+
+def unpartitioned(ddl, target, bind, dialect=None, compiler=None, **kw):
+  # ddl_if() test for the DDL of the plain table
+  return (dialect or compiler.dialect).name != 'postgresql'
+
+def exclusion_constraints(name):
+  return ['ALTER TABLE "%(name)s" ADD CONSTRAINT "ex_%(name)s_%(key)s_time" EXCLUDE USING gist '
+          '(%(key)s WITH =, tsrange(start_time, end_time) WITH &&)' % {'name': name, 'key': key}
+          for key in ('venue_id', 'artist_id')]
+
+def install(table):
+  # create_all builds Show on PostgreSQL with its primary key and a single
+  # Show_rest partition, which `flask partitions maintain` then splits
+  statements = ['ALTER TABLE "Show" ADD CONSTRAINT "Show_pkey" PRIMARY KEY (id, start_time)',
+                'CREATE TABLE "%s" PARTITION OF "Show" FOR VALUES FROM (MINVALUE) TO (MAXVALUE)' % TAIL]
+  for statement in statements + exclusion_constraints(TAIL):
+    event.listen(table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+def partitioned():
+  return db.session.get_bind().dialect.name == 'postgresql'
+
+def month_start(moment):
+  return datetime(moment.year, moment.month, 1)
+
+def add_months(month, count):
+  index = month.year * 12 + month.month - 1 + count
+  return datetime(index // 12, index % 12 + 1, 1)
+
+def next_month(month):
+  return add_months(month, 1)
+
+def month_partition(month):
+  return 'Show_y%04dm%02d' % (month.year, month.month)
+
+def bound(moment):
+  return "'%s'" % moment.isoformat(' ')
+
+def attached():
+  # (name, bounds) of Show's partitions, in name order
+  return db.session.execute(text(
+    'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+    'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = \'"Show"\'::regclass ORDER BY c.relname')).all()
+
+def monthly_partitions():
+  # the first days of the months with a partition, oldest first
+  months = []
+  for name, _ in attached():
+    match = MONTH_PARTITION.match(name)
+    if match:
+      months.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+  return months
+
+def split_months(until, now=None):
+  # gives each month before `until` (the first of a month) its own partition,
+  # moving its shows out of Show_rest. New months follow the newest monthly
+  # partition, or start with the oldest show's month (at the latest this
+  # month) when there is none. Show is locked until the caller commits.
+  # Returns the new partitions' names.
+  now = now or datetime.now()
+  months = monthly_partitions()
+  if months:
+    month = next_month(months[-1])
+  else:
+    oldest = db.session.execute(text('SELECT min(start_time) FROM "%s"' % TAIL)).scalar()
+    month = month_start(min(oldest or now, now))
+  created = []
+  if month >= until:
+    return created
+  db.session.execute(text('ALTER TABLE "Show" DETACH PARTITION "%s"' % TAIL))
+  while month < until:
+    name = month_partition(month)
+    db.session.execute(text('CREATE TABLE "%s" PARTITION OF "Show" FOR VALUES FROM (%s) TO (%s)' % (
+      name, bound(month), bound(next_month(month)))))
+    for statement in exclusion_constraints(name):
+      db.session.execute(text(statement))
+    created.append(name)
+    month = next_month(month)
+  db.session.execute(text('INSERT INTO "Show" SELECT * FROM "%s" WHERE start_time < :until' % TAIL), {'until': until})
+  db.session.execute(text('DELETE FROM "%s" WHERE start_time < :until' % TAIL), {'until': until})
+  db.session.execute(text('ALTER TABLE "Show" ATTACH PARTITION "%s" FOR VALUES FROM (%s) TO (MAXVALUE)' % (
+    TAIL, bound(until))))
+  return created
+
+def archive_months(before, schema=ARCHIVE_SCHEMA):
+  # detaches the monthly partitions that end by `before` and moves them to
+  # `schema`, out of the queries' way; returns their names
+  archived = []
+  for month in monthly_partitions():
+    if next_month(month) > before:
+      break
+    if not archived:
+      db.session.execute(text('CREATE SCHEMA IF NOT EXISTS "%s"' % schema))
+    name = month_partition(month)
+    db.session.execute(text('ALTER TABLE "Show" DETACH PARTITION "%s"' % name))
+    db.session.execute(text('ALTER TABLE "%s" SET SCHEMA "%s"' % (name, schema)))
+    archived.append(name)
+  return archived
+
+partitions = AppGroup('partitions', help='Maintain the monthly partitions of the Show table (PostgreSQL).')
+
+@partitions.command('maintain')
+@click.option('--ahead', type=int, default=AHEAD_MONTHS, show_default=True,
+              help='Months after this one that get their own partition.')
+@click.option('--keep', type=int, default=None,
+              help='Months of history to keep in Show; older months are archived. Keeps everything by default.')
+@click.option('--schema', default=ARCHIVE_SCHEMA, show_default=True, help='Schema archived months are moved to.')
+def partitions_maintain(ahead, keep, schema):
+  """Create the coming months' partitions and archive the old ones."""
+  if not partitioned():
+    raise click.ClickException('Show is only partitioned on PostgreSQL.')
+  from queries import reconcile_counters
+  this_month = month_start(datetime.now())
+  created = split_months(add_months(this_month, ahead + 1))
+  archived = archive_months(add_months(this_month, -keep), schema) if keep is not None else []
+  db.session.commit()
+  if archived:
+    # archived shows no longer count towards past_count
+    reconcile_counters()
+  click.echo('Created %d partitions, archived %d to "%s".' % (len(created), len(archived), schema))
+  for name in created + ['%s.%s' % (schema, name) for name in archived]:
+    click.echo('  %s' % name)
+
+@partitions.command('list')
+def partitions_list():
+  """List Show's partitions and their bounds."""
+  if not partitioned():
+    raise click.ClickException('Show is only partitioned on PostgreSQL.')
+  for name, bounds in attached():
+    click.echo('%-20s %s' % (name, bounds))
@@ -0,0 +1,186 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+# Opt-in request profiling (PROFILE_REQUESTS). Each request records its wall
+# time, template render time, SQL statement count and DB time, and flags
+# statements run repeatedly (the N+1 pattern). The numbers go out as a
+# Server-Timing header and a JSON log line, and are kept per endpoint for
+# the percentiles on /_debug/profile. Streamed responses are timed up to
+# the first byte. Each app keeps its own settings and samples, and only its
+# engines are listened to.
+
+PERCENTILES = (50, 95, 99)
+
+
+class RequestProfile(object):
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall = 0.0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.statements = OrderedDict()
+        self.query_count = 0
+
+    def record_statement(self, statement, parameters, duration):
+        self.query_count += 1
+        self.db_time += duration
+        runs = self.statements.setdefault(statement, [0, set()])
+        runs[0] += 1
+        runs[1].add(repr(parameters))
+
+    def duplicates(self, threshold):
+        # statements run at least `threshold` times; different parameters on
+        # each run is the N+1 signature, identical ones a plain repeat
+        return [{
+            'statement': ' '.join(statement.split())[:200],
+            'count': count,
+            'distinct_parameters': len(parameters)
+        } for statement, (count, parameters) in self.statements.items() if count >= threshold]
+
+
+def percentile(values, pct):
+    # nearest-rank on sorted values
+    if not values:
+        return None
+    return values[max(math.ceil(pct / 100.0 * len(values)), 1) - 1]
+
+
+def current_profile():
+    return g.get('profile') if has_request_context() else None
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    if profile is not None and conn.info.get('profile_started'):
+        profile.record_statement(statement, parameters, time.perf_counter() - conn.info['profile_started'].pop())
+
+
+def handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('profile_started'):
+        context.connection.info['profile_started'].pop()
+
+
+CURSOR_LISTENERS = [('before_cursor_execute', before_cursor_execute),
+                    ('after_cursor_execute', after_cursor_execute),
+                    ('handle_error', handle_error)]
+
+
+def instrument(engine):
+    # times the statements of one engine; listening twice is a no-op
+    for name, listener in CURSOR_LISTENERS:
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+
+
+class ProfileState(object):
+    # one app's settings and per-endpoint samples
+
+    def __init__(self, config):
+        self.enabled = config.get('PROFILE_REQUESTS', False)
+        self.max_samples = config.get('PROFILE_SAMPLES', 1000)
+        self.duplicate_threshold = config.get('PROFILE_DUPLICATE_THRESHOLD', 2)
+        self.samples = {}
+        self.lock = threading.Lock()
+
+
+class Profiler(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # call after db.init_app(app), which creates the engines
+        state = app.extensions['profiler'] = ProfileState(app.config)
+        if not state.enabled:
+            return
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        with app.app_context():
+            for engine in app.extensions['sqlalchemy'].engines.values():
+                instrument(engine)
+        before_render_template.connect(self.before_render, app)
+        template_rendered.connect(self.after_render, app)
+
+    @property
+    def state(self):
+        return current_app.extensions['profiler']
+
+    @property
+    def enabled(self):
+        return self.state.enabled
+
+    def current(self):
+        return current_profile()
+
+    def start_request(self):
+        g.profile = RequestProfile()
+
+    def before_render(self, sender, template, context, **extra):
+        profile = self.current()
+        if profile is not None:
+            g.profile_render_started = time.perf_counter()
+
+    def after_render(self, sender, template, context, **extra):
+        profile = self.current()
+        if profile is not None and g.get('profile_render_started') is not None:
+            profile.render_time += time.perf_counter() - g.pop('profile_render_started')
+
+    def finish_request(self, response):
+        profile = self.current()
+        if profile is None:
+            return response
+        profile.wall = time.perf_counter() - profile.started
+        state = self.state
+        duplicates = profile.duplicates(state.duplicate_threshold)
+        response.headers['Server-Timing'] = ', '.join([
+            'app;dur=%.1f' % (profile.wall * 1000),
+            'db;dur=%.1f;desc="%d queries"' % (profile.db_time * 1000, profile.query_count),
+            'render;dur=%.1f' % (profile.render_time * 1000),
+        ])
+        endpoint = request.endpoint or request.path
+        current_app.logger.log(logging.WARNING if duplicates else logging.INFO, json.dumps({
+            'profile': endpoint,
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'wall_ms': round(profile.wall * 1000, 3),
+            'db_ms': round(profile.db_time * 1000, 3),
+            'render_ms': round(profile.render_time * 1000, 3),
+            'queries': profile.query_count,
+            'duplicates': duplicates,
+        }))
+        with state.lock:
+            samples = state.samples.setdefault(endpoint, deque(maxlen=state.max_samples))
+            samples.append((profile.wall, profile.db_time, profile.render_time, profile.query_count, len(duplicates)))
+        return response
+
+    def stats(self):
+        state = self.state
+        with state.lock:
+            samples = {endpoint: list(rows) for endpoint, rows in state.samples.items()}
+        stats = []
+        for endpoint, rows in sorted(samples.items()):
+            entry = {'endpoint': endpoint, 'requests': len(rows)}
+            for index, name in enumerate(('wall_ms', 'db_ms', 'render_ms')):
+                values = sorted(row[index] * 1000 for row in rows)
+                entry[name] = {'p%d' % pct: round(percentile(values, pct), 3) for pct in PERCENTILES}
+            queries = sorted(row[3] for row in rows)
+            entry['queries'] = {'p%d' % pct: percentile(queries, pct) for pct in PERCENTILES}
+            entry['with_duplicates'] = sum(1 for row in rows if row[4])
+            stats.append(entry)
+        return stats
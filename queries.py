@@ -0,0 +1,300 @@
+import json
+import base64
+from datetime import datetime
+
+from flask import request
+from flask.cli import AppGroup
+import click
+from sqlalchemy import tuple_, and_, func, select, union_all, literal, literal_column
+
+import feed
+import search
+from extensions import db, async_db, page_cache
+from models import Venue, Artist, Show, CounterRollover, Tombstone, genre_members
+
+#----------------------------------------------------------------------------#
+# Pagination.
+#----------------------------------------------------------------------------#
+
+SHOWS_PER_PAGE = 30
+SEARCH_RESULTS_PER_PAGE = 20
+VENUES_PER_PAGE = 200
+DETAIL_SHOWS_PER_PAGE = 12
+
+def encode_cursor(*values):
+  # opaque keyset cursor for a position in an ordered listing
+  raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+  return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor, *types):
+  if not cursor:
+    return None
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if len(values) != len(types):
+      return None
+    return tuple(convert(value) for convert, value in zip(types, values))
+  except (ValueError, TypeError):
+    return None
+
+#----------------------------------------------------------------------------#
+# Counters.
+#----------------------------------------------------------------------------#
+
+def counter_watermark(for_update=False):
+  # writers share-lock the watermark row so a rollover cannot move it
+  # while they classify a show as past or future
+  rollover = CounterRollover.query.with_for_update(read=not for_update).first()
+  if rollover is None:
+    rollover = CounterRollover(rolled_at=datetime.now())
+    db.session.add(rollover)
+    db.session.flush()
+  return rollover.rolled_at
+
+def bury(model, ids):
+  # records the ids a select returns as deleted from model's table, for the
+  # incremental exports; call before deleting them
+  db.session.execute(Tombstone.__table__.insert().from_select(['entity_id', 'table_name', 'deleted_at'],
+    ids.add_columns(literal(model.__tablename__), literal(datetime.utcnow()))))
+
+def remove_venue_shows(venue_id):
+  # take the venue's shows off their artists' counters, then delete them
+  watermark = counter_watermark()
+  at_venue = and_(Show.venue_id == venue_id, Show.artist_id == Artist.id)
+  past = db.session.query(func.count(Show.id)).filter(at_venue, Show.start_time <= watermark).scalar_subquery()
+  future = db.session.query(func.count(Show.id)).filter(at_venue, Show.start_time > watermark).scalar_subquery()
+  Artist.query.filter(Artist.id.in_(db.session.query(Show.artist_id).filter(Show.venue_id == venue_id))).\
+    update({Artist.past_count: Artist.past_count - past, Artist.future_count: Artist.future_count - future},
+      synchronize_session=False)
+  bury(Show, select(Show.id).where(Show.venue_id == venue_id))
+  Show.query.filter(Show.venue_id == venue_id).delete(synchronize_session=False)
+  feed.remove_venue(venue_id)
+
+def roll_over_counters(now=None):
+  # move shows that started since the last rollover from future to past
+  now = now or datetime.now()
+  rollover = CounterRollover.query.with_for_update().first()
+  if rollover is None:
+    return reconcile_counters(now)
+  if now <= rollover.rolled_at:
+    return 0
+  window = and_(Show.start_time > rollover.rolled_at, Show.start_time <= now)
+  moved = db.session.query(func.count(Show.id)).filter(window).scalar()
+  for model, show_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    crossed = db.session.query(func.count(Show.id)).filter(show_fk == model.id, window).scalar_subquery()
+    # the new counters go out with the next incremental export
+    model.query.filter(model.id.in_(db.session.query(show_fk).filter(window))).\
+      update({model.past_count: model.past_count + crossed, model.future_count: model.future_count - crossed,
+        model.updated_at: datetime.utcnow()}, synchronize_session=False)
+  touched = db.session.query(Show.venue_id, Show.artist_id).filter(window).distinct().all()
+  rollover.rolled_at = now
+  db.session.commit()
+  page_cache.invalidate('venues', *set(
+    ['venue:%s' % venue_id for venue_id, _ in touched] + ['artist:%s' % artist_id for _, artist_id in touched]))
+  return moved
+
+def reconcile_counters(now=None):
+  # rebuild every counter from the Show table in one UPDATE per entity table
+  now = now or datetime.now()
+  counter_watermark(for_update=True)
+  CounterRollover.query.update({CounterRollover.rolled_at: now}, synchronize_session=False)
+  for model, show_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    past = db.session.query(func.count(Show.id)).filter(show_fk == model.id, Show.start_time <= now).scalar_subquery()
+    future = db.session.query(func.count(Show.id)).filter(show_fk == model.id, Show.start_time > now).scalar_subquery()
+    model.query.update({model.past_count: past, model.future_count: future}, synchronize_session=False)
+  db.session.commit()
+  page_cache.clear()
+  return db.session.query(func.count(Show.id)).scalar()
+
+counters = AppGroup('counters', help='Maintain the Venue/Artist past_count and future_count columns.')
+
+@counters.command('rollover')
+def counters_rollover():
+  """Move shows that have started since the last run from future to past."""
+  click.echo('Rolled %d shows over to past.' % roll_over_counters())
+
+@counters.command('reconcile')
+def counters_reconcile():
+  """Rebuild all counters from the Show table."""
+  click.echo('Recounted %d shows.' % reconcile_counters())
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+def venue_pages(venue_id):
+  # cached pages that render a venue: its own, the listings, and the pages
+  # of every artist who has played there
+  artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+  return ['venue:%s' % venue_id, 'venues', 'shows', 'feed'] + ['artist:%s' % artist_id for artist_id, in artist_ids]
+
+def artist_pages(artist_id):
+  venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+  return ['artist:%s' % artist_id, 'artists', 'shows', 'feed'] + ['venue:%s' % venue_id for venue_id, in venue_ids]
+
+def touch_venue_artists(venue_id):
+  # artist pages render the venues they played at, so they change with them
+  Artist.query.filter(Artist.id.in_(db.session.query(Show.artist_id).filter(Show.venue_id == venue_id))).\
+    update({Artist.updated_at: datetime.utcnow()}, synchronize_session=False)
+
+def touch_artist_venues(artist_id):
+  Venue.query.filter(Venue.id.in_(db.session.query(Show.venue_id).filter(Show.artist_id == artist_id))).\
+    update({Venue.updated_at: datetime.utcnow()}, synchronize_session=False)
+
+def detail_validator(model, entity_id):
+  # a detail page changes with its row (writes touch updated_at of every page
+  # that renders a show or a related name) and with each counter rollover
+  watermark = db.session.query(CounterRollover.rolled_at).scalar_subquery()
+  row = db.session.query(model.updated_at, watermark).filter(model.id == entity_id).first()
+  if row is None:
+    return None
+  return (model.__tablename__, entity_id, row[0], row[1]), row[0]
+
+def listing_validator(name, query, *columns):
+  # the newest updated_at across the listed rows, plus their count for deletions
+  page = query.add_columns(*[column.label('updated_at_%d' % i) for i, column in enumerate(columns)]).subquery()
+  row = db.session.query(func.count(), *[func.max(page.c['updated_at_%d' % i]) for i in range(len(columns))]).one()
+  newest = max([stamp for stamp in row[1:] if stamp is not None], default=None)
+  return (name, request.query_string, tuple(row)), newest
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+def search_results(model, search_term, page, genre=None):
+  # matches come ranked from the search index; upcoming show counts are
+  # read from the maintained future_count column
+  hits = search.matching(model, search_term, db.session.get_bind().dialect.name)
+  count = db.session.query(func.count()).select_from(hits)
+  rows = db.session.query(model.id, model.name, model.future_count.label('num_upcoming_shows')).\
+    join(hits, hits.c.id == model.id)
+  if genre:
+    count = count.filter(hits.c.id.in_(genre_members(model, genre)))
+    rows = rows.filter(model.id.in_(genre_members(model, genre)))
+  # the count and the page are independent, so they run together (see asyncdb)
+  count, rows = async_db.run(count, rows.order_by(hits.c.rank.desc(), model.name, model.id).
+    limit(SEARCH_RESULTS_PER_PAGE).offset((page - 1) * SEARCH_RESULTS_PER_PAGE))
+  count, rows = count.scalar(), rows.all()
+  return {
+    "count": count,
+    "data": [{
+      "id": row.id,
+      "name": row.name,
+      "num_upcoming_shows": row.num_upcoming_shows
+    } for row in rows],
+    "page": page,
+    "pages": max(1, -(-count // SEARCH_RESULTS_PER_PAGE))
+  }
+
+def venue_order():
+  # (city, state, name, id) as /venues sorts and pages on them, and as
+  # ix_Venue_listing indexes them: a missing city, state or name is '', which
+  # a cursor can carry and a row comparison matches (NULL never does)
+  return [func.coalesce(column, literal_column("''")) for column in (Venue.city, Venue.state, Venue.name)] + [Venue.id]
+
+def venue_listing(after, genre=None):
+  # one page of the venue listing, ordered by area, plus one row to detect more
+  city, state, name, venue_id = venue_order()
+  query = db.session.query(venue_id, name.label('name'), city.label('city'), state.label('state'), Venue.future_count)
+  if genre:
+    query = query.filter(Venue.id.in_(genre_members(Venue, genre)))
+  if after:
+    query = query.filter(tuple_(city, state, name, venue_id) > after)
+  return query.order_by(city, state, name, venue_id).limit(VENUES_PER_PAGE + 1)
+
+def artist_listing(genre=None):
+  query = Artist.query
+  if genre:
+    query = query.filter(Artist.id.in_(genre_members(Artist, genre)))
+  return query.order_by(Artist.name)
+
+def show_listing(before, after, limit=SHOWS_PER_PAGE):
+  # one page of the show listing, newest first, plus one row to detect more
+  # (every remaining show when limit is None); with `before` the page walks
+  # back towards newer shows in ascending order
+  query = db.session.query(
+    Show.id,
+    Show.start_time,
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Venue.timezone.label('venue_timezone')).\
+    join(Venue, Show.venue_id == Venue.id).\
+    join(Artist, Show.artist_id == Artist.id)
+  # the cursors' start_time is repeated as a plain bound: partition pruning
+  # (PostgreSQL) does not look into row comparisons
+  position = tuple_(Show.start_time, Show.id)
+  if before:
+    query = query.filter(position > before, Show.start_time >= before[0]).\
+      order_by(Show.start_time.asc(), Show.id.asc())
+  else:
+    if after:
+      query = query.filter(position < after, Show.start_time <= after[0])
+    query = query.order_by(Show.start_time.desc(), Show.id.desc())
+  return query.limit(limit + 1) if limit is not None else query
+
+def shows_with(other, other_fk, show_fk, entity_id):
+  # shows of one venue (or artist) joined with the artist (or venue) playing
+  # them; `timezone` is the joined venue's, or NULL on a venue's own page
+  return db.session.query(
+    Show.id.label('id'),
+    Show.start_time.label('start_time'),
+    other.id.label('other_id'),
+    other.name.label('other_name'),
+    other.image_link.label('other_image_link'),
+    (other.timezone if other is Venue else literal(None, db.String)).label('timezone')).\
+    join(other, other_fk == other.id).\
+    filter(show_fk == entity_id)
+
+def detail_shows(other, other_fk, show_fk, entity_id, now):
+  # one query for a detail page: the nearest DETAIL_SHOWS_PER_PAGE + 1 shows on
+  # each side of `now`, each side an index range scan, returned in time order
+  shows = shows_with(other, other_fk, show_fk, entity_id)
+  upcoming = shows.filter(Show.start_time >= now).\
+    order_by(Show.start_time.asc(), Show.id.asc()).limit(DETAIL_SHOWS_PER_PAGE + 1).subquery()
+  past = shows.filter(Show.start_time < now).\
+    order_by(Show.start_time.desc(), Show.id.desc()).limit(DETAIL_SHOWS_PER_PAGE + 1).subquery()
+  both = union_all(select(upcoming), select(past)).subquery()
+  return db.session.query(both).order_by(both.c.start_time, both.c.id)
+
+def entity_with_shows(model, other, other_fk, show_fk, entity_id, now):
+  # a detail page's entity (None when there is none) and its detail_shows
+  # rows, queried together (see asyncdb)
+  entity, shows = async_db.run(model.query.filter_by(id=entity_id),
+    detail_shows(other, other_fk, show_fk, entity_id, now))
+  return entity.scalars().first(), shows.all()
+
+def more_shows(other, other_fk, show_fk, entity_id, when, after):
+  # the next page of past (newest first) or upcoming (soonest first) shows after a cursor
+  # start_time bounded on its own too, for partition pruning (see show_listing)
+  query = shows_with(other, other_fk, show_fk, entity_id)
+  position = tuple_(Show.start_time, Show.id)
+  if when == 'upcoming':
+    query = query.filter(position > after, Show.start_time >= after[0]).order_by(Show.start_time.asc(), Show.id.asc())
+  else:
+    query = query.filter(position < after, Show.start_time <= after[0]).order_by(Show.start_time.desc(), Show.id.desc())
+  return query.limit(DETAIL_SHOWS_PER_PAGE + 1).all()
+
+def split_shows(rows, now):
+  # rows arrive in time order; past shows are returned newest first
+  past, upcoming = [], []
+  for row in rows:
+    (upcoming if row.start_time >= now else past).append(row)
+  past.reverse()
+  return past, upcoming
+
+def show_tiles(rows, prefix, timezone=None):
+  return [{
+    prefix + "_id": row.other_id,
+    prefix + "_name": row.other_name,
+    prefix + "_image_link": row.other_image_link,
+    "start_time": row.start_time,
+    "timezone": row.timezone or timezone
+  } for row in rows[:DETAIL_SHOWS_PER_PAGE]]
+
+def next_shows_cursor(rows):
+  if len(rows) <= DETAIL_SHOWS_PER_PAGE:
+    return None
+  last = rows[DETAIL_SHOWS_PER_PAGE - 1]
+  return encode_cursor(last.start_time, last.id)
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, union_all, literal, bindparam
+from sqlalchemy.exc import IntegrityError
+
+import conflicts
+import feed
+from extensions import db, page_cache
+from models import Venue, Artist, Show, MAX_SHOW_DURATION
+from queries import counter_watermark
+
+# The write path for shows, used by the show form, the bulk scheduling
+# endpoint and the show import. A batch is written as one unit: its foreign
+# keys are checked with one set-based query, overlaps with other shows at
+# the venue or of the artist through conflicts.py, the rows that pass go in
+# with a multi-row INSERT, the counters are adjusted with one UPDATE per
+# table, the upcoming ones are copied into the feed (feed.py), and the
+# transaction commits once. Rows that cannot be written are
+# refused one by one with their errors, and the rest of the batch is still
+# written.
+
+SCHEDULE_MAX_SHOWS = 1000
+# a show without an end time is booked for this long
+SHOW_DURATION = timedelta(hours=2)
+# checks and writes of an import batch before its rows are refused as conflicts
+WRITE_ATTEMPTS = 3
+CONFLICT_ERROR = {"start_time": ["Conflicts with a show booked at the same time by another writer; import it again."]}
+
+def show_end(start_time, end_time=None):
+  return end_time or start_time + SHOW_DURATION
+
+def duration_errors(start_time, end_time):
+  # errors for an end_time not after start_time, or past MAX_SHOW_DURATION
+  if end_time <= start_time:
+    return {"end_time": ["Must be after start_time."]}
+  if end_time - start_time > MAX_SHOW_DURATION:
+    return {"end_time": ["Must be at most %d hours after start_time." % (MAX_SHOW_DURATION.total_seconds() // 3600)]}
+  return None
+
+def existing_keys(records):
+  # the ('venue_id', id) and ('artist_id', id) pairs of the batch that exist
+  query = union_all(
+    select(literal('venue_id'), Venue.id).where(Venue.id.in_({record['venue_id'] for record in records})),
+    select(literal('artist_id'), Artist.id).where(Artist.id.in_({record['artist_id'] for record in records})))
+  return {(key, entity_id) for key, entity_id in db.session.execute(query)}
+
+def missing_keys(records):
+  # {index: errors} for the records whose venue or artist does not exist
+  found = existing_keys(records)
+  refused = {}
+  for index, record in enumerate(records):
+    if ('venue_id', record['venue_id']) not in found:
+      refused[index] = {"venue_id": ["No venue with id %s." % record['venue_id']]}
+    elif ('artist_id', record['artist_id']) not in found:
+      refused[index] = {"artist_id": ["No artist with id %s." % record['artist_id']]}
+  return refused
+
+def write_shows(records):
+  # inserts checked records and counts them; returns the new ids in record
+  # order. The caller commits.
+  table = Show.__table__
+  ids = db.session.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), records).scalars().all()
+  count_shows(records)
+  feed.add_shows(records, ids)
+  return ids
+
+def count_shows(records):
+  # fold a batch of new shows into the counters with one executemany per table
+  watermark = counter_watermark()
+  for model, key in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+    deltas = {}
+    for record in records:
+      past, future = deltas.setdefault(record[key], [0, 0])
+      deltas[record[key]] = [past + (record['start_time'] <= watermark), future + (record['start_time'] > watermark)]
+    db.session.execute(
+      model.__table__.update().where(model.__table__.c.id == bindparam('entity_id')).values(
+        past_count=model.__table__.c.past_count + bindparam('past'),
+        future_count=model.__table__.c.future_count + bindparam('future'),
+        updated_at=datetime.utcnow()),
+      [{"entity_id": entity_id, "past": past, "future": future} for entity_id, (past, future) in deltas.items()])
+
+def refused_shows(records, rows=None, noun='row'):
+  # {index: errors} for the records with an unknown venue or artist, or
+  # overlapping a booked show or an earlier record, which is cited by its
+  # number in rows; call under conflicts.exclusive() until the batch is
+  # committed
+  refused = missing_keys(records)
+  positions = [index for index in range(len(records)) if index not in refused]
+  overlaps = conflicts.overlapping([records[index] for index in positions],
+    [rows[index] if rows else index for index in positions], noun)
+  for position, errors in overlaps.items():
+    refused[positions[position]] = errors
+  return refused
+
+def insert_shows(records, lines=None):
+  # the import writer: one transaction per batch, refusals by index; an
+  # overlap with an earlier record cites its line in the file. A writer that
+  # bypasses conflicts.exclusive() can still book an overlapping show between
+  # the check and the INSERT; the exclusion constraints then refuse the
+  # batch, and it is checked again against what that writer committed. Rows
+  # still failing after WRITE_ATTEMPTS are refused, as /shows/schedule
+  # answers 409.
+  noun = 'line' if lines else 'row'
+  for _ in range(WRITE_ATTEMPTS):
+    with conflicts.exclusive(records):
+      refused = refused_shows(records, lines, noun)
+      accepted = [record for index, record in enumerate(records) if index not in refused]
+      try:
+        ids = write_shows(accepted) if accepted else []
+        db.session.commit()
+      except IntegrityError:
+        db.session.rollback()
+        continue
+      conflicts.remember(accepted, ids)
+      return refused
+  refused.update({index: CONFLICT_ERROR for index in range(len(records)) if index not in refused})
+  return refused
+
+def show_record(artist_id, row):
+  # (record, None) or (None, errors) for one {venue_id, start_time[, end_time]} row
+  if not hasattr(row, 'get'):
+    return None, {"row": ["Must be an object with venue_id and start_time."]}
+  errors = {}
+  try:
+    venue_id = int(row.get('venue_id'))
+  except (TypeError, ValueError):
+    errors['venue_id'] = ["Must be an integer id."]
+  try:
+    start_time = datetime.fromisoformat(row.get('start_time'))
+  except (TypeError, ValueError):
+    errors['start_time'] = ["Must be a date and time like 2030-05-01 20:00."]
+  try:
+    end_time = datetime.fromisoformat(row['end_time']) if row.get('end_time') else None
+  except (TypeError, ValueError):
+    errors['end_time'] = ["Must be a date and time like 2030-05-01 22:00."]
+  if errors:
+    return None, errors
+  # stored as naive venue wall-clock times
+  start_time = start_time.replace(tzinfo=None)
+  end_time = show_end(start_time, end_time and end_time.replace(tzinfo=None))
+  errors = duration_errors(start_time, end_time)
+  if errors:
+    return None, errors
+  return {"venue_id": venue_id, "artist_id": artist_id, "start_time": start_time, "end_time": end_time,
+    "updated_at": datetime.utcnow()}, None
+
+def schedule_shows(artist_id, rows):
+  # schedules one artist's shows from rows of {venue_id, start_time[, end_time]}
+  # in a single transaction; returns the new show ids and the refused rows
+  try:
+    artist_id = int(artist_id)
+  except (TypeError, ValueError):
+    refusal = {"artist_id": ["Must be an integer id."]}
+    return schedule_report([], {index: refusal for index in range(len(rows))})
+  refused, records, positions = {}, [], []
+  for index, row in enumerate(rows):
+    record, errors = show_record(artist_id, row)
+    if errors:
+      refused[index] = errors
+      continue
+    records.append(record)
+    positions.append(index)
+  accepted, ids = [], []
+  with conflicts.exclusive(records):
+    if records:
+      for position, errors in refused_shows(records, positions).items():
+        refused[positions[position]] = errors
+    accepted = [record for record, index in zip(records, positions) if index not in refused]
+    if accepted:
+      try:
+        ids = write_shows(accepted)
+        db.session.commit()
+      except Exception:
+        db.session.rollback()
+        raise
+      conflicts.remember(accepted, ids)
+  if accepted:
+    page_cache.invalidate('artist:%s' % artist_id, 'venues', 'shows', 'feed',
+      *{'venue:%s' % record['venue_id'] for record in accepted})
+  return schedule_report(ids, refused)
+
+def schedule_report(ids, refused):
+  return {
+    "accepted": len(ids),
+    "rejected": len(refused),
+    "shows": ids,
+    "errors": [{"row": index, "errors": refused[index]} for index in sorted(refused)]
+  }
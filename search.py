@@ -0,0 +1,68 @@
+from sqlalchemy import DDL, event, literal, select, column, table, text, func
+
+# Venue and Artist keep a denormalized, lower-cased `search_text` column
+# (name, "city, state" and genres). On PostgreSQL it carries a pg_trgm GIN
+# index, which serves infix ILIKE matches; on SQLite an FTS5 table with the
+# trigram tokenizer mirrors it so search also works against a local file.
+
+TRIGRAM_LENGTH = 3
+
+
+def search_document(name, city, state, genres):
+    parts = [name or '', '%s, %s' % (city or '', state or ''), ' '.join(genres or [])]
+    return ' '.join(parts).lower()
+
+
+def like_pattern(search_term):
+    escaped = search_term.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%' + escaped + '%'
+
+
+def fts_table_name(model):
+    return model.__tablename__ + '_search'
+
+
+def install(metadata, *models):
+    event.listen(metadata, 'before_create',
+                 DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+    for model in models:
+        name, fts = model.__tablename__, fts_table_name(model)
+        statements = [
+            'CREATE VIRTUAL TABLE "%(fts)s" USING fts5(search_text, '
+            'content=\'%(name)s\', content_rowid=\'id\', tokenize=\'trigram\')',
+            'CREATE TRIGGER "%(fts)s_ai" AFTER INSERT ON "%(name)s" BEGIN '
+            'INSERT INTO "%(fts)s"(rowid, search_text) VALUES (new.id, new.search_text); END',
+            'CREATE TRIGGER "%(fts)s_ad" AFTER DELETE ON "%(name)s" BEGIN '
+            'INSERT INTO "%(fts)s"("%(fts)s", rowid, search_text) VALUES (\'delete\', old.id, old.search_text); END',
+            # counters and updated_at change far more often than the text
+            'CREATE TRIGGER "%(fts)s_au" AFTER UPDATE OF search_text ON "%(name)s" BEGIN '
+            'INSERT INTO "%(fts)s"("%(fts)s", rowid, search_text) VALUES (\'delete\', old.id, old.search_text); '
+            'INSERT INTO "%(fts)s"(rowid, search_text) VALUES (new.id, new.search_text); END',
+        ]
+        for statement in statements:
+            event.listen(model.__table__, 'after_create',
+                         DDL(statement % {'fts': fts, 'name': name}).execute_if(dialect='sqlite'))
+        event.listen(model.__table__, 'before_drop',
+                     DDL('DROP TABLE IF EXISTS "%s"' % fts).execute_if(dialect='sqlite'))
+
+
+def matching(model, search_term, dialect):
+    # returns a subquery of (id, rank) for every row matching search_term,
+    # higher rank first
+    pattern = like_pattern(search_term)
+    if dialect == 'postgresql':
+        return select(
+            model.id.label('id'),
+            func.word_similarity(search_term.lower(), model.search_text).label('rank')).\
+            where(model.search_text.ilike(pattern, escape='\\')).subquery()
+    if dialect == 'sqlite' and len(search_term) >= TRIGRAM_LENGTH:
+        fts = fts_table_name(model)
+        return select(
+            column('rowid').label('id'),
+            (-column('rank')).label('rank')).\
+            select_from(table(fts)).\
+            where(text('"%s" MATCH :search_query' % fts).
+                  bindparams(search_query='"%s"' % search_term.replace('"', '""'))).subquery()
+    # terms shorter than a trigram cannot use either index
+    return select(model.id.label('id'), literal(0).label('rank')).\
+        where(model.search_text.like(pattern, escape='\\')).subquery()
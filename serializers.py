@@ -0,0 +1,33 @@
+import json
+from datetime import date, datetime
+
+# Generator-based encoders: rows are written out as they are fetched, so a
+# full collection never has to be held in memory.
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def dumps(value):
+    return json.dumps(value, default=json_default)
+
+
+def pick(row, fields):
+    return {field: getattr(row, field) for field in fields}
+
+
+def stream_page(rows, fields, limit=None, cursor_of=None):
+    # streams {"data": [...], "next": cursor}; with a limit, rows should hold
+    # one extra row so the cursor is only emitted when another page exists
+    yield '{"data": ['
+    count, last, more = 0, None, False
+    for row in rows:
+        if limit is not None and count == limit:
+            more = True
+            break
+        yield (',' if count else '') + dumps(pick(row, fields))
+        count, last = count + 1, row
+    yield '], "next": %s}' % dumps(cursor_of(last) if more and cursor_of else None)
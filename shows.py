@@ -0,0 +1,125 @@
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, flash, abort, jsonify
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+import feed
+import scheduling
+from cache import conditional
+from database import read_only
+from extensions import page_cache
+from models import Venue, Artist, Show
+from queries import SHOWS_PER_PAGE, encode_cursor, decode_cursor, listing_validator, show_listing
+
+bp = Blueprint('shows', __name__)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+@read_only
+@conditional(lambda: listing_validator('shows',
+  show_listing(decode_cursor(request.args.get('before'), datetime.fromisoformat, int),
+    decode_cursor(request.args.get('after'), datetime.fromisoformat, int)),
+  Show.updated_at, Venue.updated_at, Artist.updated_at))
+@page_cache.cached(lambda: 'shows')
+def shows():
+  # displays list of shows at /shows, newest first, one keyset page at a time
+  before = decode_cursor(request.args.get('before'), datetime.fromisoformat, int)
+  after = decode_cursor(request.args.get('after'), datetime.fromisoformat, int)
+  rows = show_listing(before, after).all()
+  if before:
+    # walking back towards newer shows comes back ascending
+    has_newer = len(rows) > SHOWS_PER_PAGE
+    rows = rows[:SHOWS_PER_PAGE][::-1]
+    has_older = True
+  else:
+    has_older = len(rows) > SHOWS_PER_PAGE
+    rows = rows[:SHOWS_PER_PAGE]
+    has_newer = after is not None
+  data = [{
+    "venue_id": row.venue_id,
+    "venue_name": row.venue_name,
+    "artist_id": row.artist_id,
+    "artist_name": row.artist_name,
+    "artist_image_link": row.artist_image_link,
+    "start_time": row.start_time,
+    "timezone": row.venue_timezone
+  } for row in rows]
+  pages = {
+    "next": encode_cursor(rows[-1].start_time, rows[-1].id) if rows and has_older else None,
+    "prev": encode_cursor(rows[0].start_time, rows[0].id) if rows and has_newer else None
+  }
+  return render_template('pages/shows.html', shows=data, pages=pages)
+
+@bp.route('/shows/upcoming')
+@read_only
+@page_cache.cached(lambda: 'feed')
+def upcoming_shows():
+  # the upcoming shows feed: ?range=week|month, ?city=&state= for one city,
+  # ?after= for the next page; reads UpcomingShow only (see feed.py)
+  window = request.args.get('range', 'week')
+  if window not in feed.FEED_RANGES:
+    abort(404)
+  days = feed.FEED_RANGES[window]
+  city, state = request.args.get('city'), request.args.get('state')
+  after = decode_cursor(request.args.get('after'), datetime.fromisoformat, int)
+  rows = feed.upcoming_feed(days, city, state, after).limit(feed.FEED_PAGE_SIZE + 1).all()
+  more = len(rows) > feed.FEED_PAGE_SIZE
+  rows = rows[:feed.FEED_PAGE_SIZE]
+  data = [{
+    "venue_id": row.venue_id,
+    "venue_name": row.venue_name,
+    "artist_id": row.artist_id,
+    "artist_name": row.artist_name,
+    "artist_image_link": row.artist_image_link,
+    "city": row.city,
+    "state": row.state,
+    "start_time": row.start_time,
+    "timezone": row.venue_timezone
+  } for row in rows]
+  next_page = encode_cursor(rows[-1].start_time, rows[-1].show_id) if more else None
+  return render_template('pages/upcoming_shows.html', shows=data, window=window, windows=sorted(feed.FEED_RANGES,
+    key=feed.FEED_RANGES.get), city=city, state=state, cities=feed.feed_cities(days), next_page=next_page)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # FINISHED: insert form data as a new Show record in the db, instead
+  try:
+    report = scheduling.schedule_shows(request.form.get('artist_id'), [request.form])
+  except SQLAlchemyError:
+    report = None
+  if report and report['accepted']:
+    # on successful db insert, flash success
+    flash('Show was successfully listed!')
+  else:
+    # FINISHED: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    flash('An error occured. Show could not be listed.')
+  return render_template('pages/home.html')
+
+@bp.route('/shows/schedule', methods=['POST'])
+def schedule_shows():
+  # bulk scheduling for one artist, e.g. a tour:
+  # {"artist_id": 1, "shows": [{"venue_id": 2, "start_time": "2030-05-01T20:00"}, ...]}
+  # valid rows are written in one transaction; the others come back by index
+  body = request.get_json(silent=True)
+  if not isinstance(body, dict) or not isinstance(body.get('shows'), list):
+    abort(400)
+  if len(body['shows']) > scheduling.SCHEDULE_MAX_SHOWS:
+    abort(413)
+  try:
+    report = scheduling.schedule_shows(body.get('artist_id'), body['shows'])
+  except IntegrityError:
+    # an overlapping show was booked by a concurrent request after the check
+    abort(409)
+  return jsonify(report)
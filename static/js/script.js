@@ -2,3 +2,18 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+document.addEventListener('click', function (event) {
+  var link = event.target.closest && event.target.closest('a.load-more');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.href).then(function (response) {
+    return response.text();
+  }).then(function (html) {
+    var holder = link.parentNode;
+    holder.insertAdjacentHTML('beforebegin', html);
+    holder.parentNode.removeChild(holder);
+  });
+});
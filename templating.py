@@ -0,0 +1,48 @@
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+from jinja2.bccache import Bucket
+
+# Compiled templates are kept in a filesystem bytecode cache shared by every
+# worker on the host (TEMPLATE_CACHE_DIR), so a cold worker loads bytecode
+# instead of compiling. With TEMPLATE_WARMUP each worker loads every
+# template at startup rather than on its first request for it, and with
+# TEMPLATES_AUTO_RELOAD off it never checks the template files again.
+
+
+class HashedBytecodeCache(FileSystemBytecodeCache):
+    # the cache file is keyed by the template source hash as well as its
+    # name, so two releases sharing the directory do not overwrite each
+    # other's bytecode on every load
+
+    def get_bucket(self, environment, name, filename, source):
+        checksum = self.get_source_checksum(source)
+        bucket = Bucket(environment, '%s-%s' % (self.get_cache_key(name, filename), checksum), checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+
+def init_app(app):
+    # call after the filters and globals the templates use are registered
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = HashedBytecodeCache(directory)
+    if app.config.get('TEMPLATE_WARMUP'):
+        loaded, elapsed = warm_up(app)
+        app.logger.info('Loaded %d templates in %.1f ms', loaded, elapsed * 1000)
+
+
+def template_names(app):
+    return sorted(name for name in app.jinja_env.list_templates() if name.endswith('.html'))
+
+
+def warm_up(app):
+    # loads every template into the environment's cache (and so into the
+    # bytecode cache); returns how many and how long it took
+    started = time.perf_counter()
+    names = template_names(app)
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names), time.perf_counter() - started
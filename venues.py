@@ -0,0 +1,241 @@
+import itertools
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, jsonify
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+import feed
+from cache import conditional
+from database import read_only
+from extensions import db, page_cache
+from models import Venue, Artist, Show
+from queries import (VENUES_PER_PAGE, encode_cursor, decode_cursor, remove_venue_shows, bury, venue_pages,
+  touch_venue_artists, detail_validator, listing_validator, search_results, venue_listing, entity_with_shows,
+  more_shows, split_shows, show_tiles, next_shows_cursor)
+
+bp = Blueprint('venues', __name__)
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+@read_only
+@conditional(lambda: listing_validator('venues',
+  venue_listing(decode_cursor(request.args.get('after'), str, str, str, int), request.args.get('genre')),
+  Venue.updated_at))
+@page_cache.cached(lambda: 'venues')
+def venues():
+  # venues come from one query sorted by area, grouped by (city, state) in a
+  # single pass and paged on (city, state, name, id); an area may span pages
+  after = decode_cursor(request.args.get('after'), str, str, str, int)
+  genre = request.args.get('genre')
+  rows = venue_listing(after, genre).all()
+  more = len(rows) > VENUES_PER_PAGE
+  rows = rows[:VENUES_PER_PAGE]
+  data = [{
+    "city": city,
+    "state": state,
+    "continued": after is not None and (city, state) == after[:2],
+    "venues": [{
+      "id": row.id,
+      "name": row.name,
+      "num_upcoming_shows": row.future_count
+    } for row in area]
+  } for (city, state), area in itertools.groupby(rows, key=lambda row: (row.city, row.state))]
+  last = rows[-1] if rows else None
+  next_page = encode_cursor(last.city, last.state, last.name, last.id) if more else None
+  return render_template('pages/venues.html', areas=data, next_page=next_page, genre=genre)
+
+@bp.route('/venues/search', methods=['POST'])
+@read_only
+def search_venues():
+
+  # FINISHED: implement search on venues with partial string search. Ensure it is case-insensitive.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_term=request.form.get('search_term', '')
+  page = max(request.form.get('page', 1, type=int), 1)
+  genre = request.form.get('genre')
+  response = search_results(Venue, search_term, page, genre)
+  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''),
+    genre=genre)
+
+@bp.route('/venues/<int:venue_id>')
+@read_only
+@conditional(lambda venue_id: detail_validator(Venue, venue_id))
+@page_cache.cached(lambda venue_id: 'venue:%d' % venue_id)
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # FINISHED: replace with real venue data from the venues table, using venue_id  --FIX GENRE VIEW--
+  now = datetime.now()
+  venue, rows = entity_with_shows(Venue, Artist, Show.artist_id, Show.venue_id, venue_id, now)
+  if venue is None:
+    abort(404)
+  past_shows, upcoming_shows = split_shows(rows, now)
+  data = {
+    'id': venue.id,
+    "name": venue.name,
+    "city": venue.city,
+    "state": venue.state,
+    "address": venue.address,
+    "phone": venue.phone,
+    "image_link": venue.image_link,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "genres": venue.genres,
+    "website_link": venue.website_link,
+    "upcoming_shows": show_tiles(upcoming_shows, 'artist', venue.timezone),
+    "past_shows": show_tiles(past_shows, 'artist', venue.timezone),
+    "more_upcoming_shows": next_shows_cursor(upcoming_shows),
+    "more_past_shows": next_shows_cursor(past_shows),
+    "past_shows_count": venue.past_count,
+    "upcoming_shows_count": venue.future_count
+  }
+  return render_template('pages/show_venue.html', venue=data)
+
+@bp.route('/venues/<int:venue_id>/shows')
+@read_only
+def venue_shows(venue_id):
+  # "load more" for a venue page: the next page of past or upcoming shows
+  when = request.args.get('when', 'past')
+  after = decode_cursor(request.args.get('after'), datetime.fromisoformat, int)
+  if after is None:
+    abort(400)
+  rows = more_shows(Artist, Show.artist_id, Show.venue_id, venue_id, when, after)
+  timezone = db.session.query(Venue.timezone).filter(Venue.id == venue_id).scalar()
+  return render_template('pages/show_venue_tiles.html', venue_id=venue_id, when=when,
+    shows=show_tiles(rows, 'artist', timezone), more=next_shows_cursor(rows))
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  # FINISHED: insert form data as a new Venue record in the db, instead
+  # FINISHED: modify data to be the data object returned from db insertion
+  # on successful db insert, flash success
+  try:
+    venue = Venue(
+      name=request.form['name'], 
+      city=request.form['city'], 
+      state=request.form['state'], 
+      address=request.form['address'],
+      phone=request.form['phone'], 
+      genres=request.form.getlist('genres'), 
+      facebook_link=request.form['facebook_link'], 
+      image_link=request.form['image_link'],
+      seeking_talent=request.form.get('seeking_talent'), 
+      seeking_description=request.form['seeking_description'], 
+      website_link=request.form['website_link'],
+      timezone=request.form.get('timezone') or None)
+    if (venue.seeking_talent == 'y'):
+      venue.seeking_talent = True
+    else:
+      venue.seeking_talent = False
+    db.session.add(venue)
+    db.session.commit()
+  except (KeyError, SQLAlchemyError):
+    # FINISHED: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    db.session.rollback()
+    flash('An error occured. Venue ' + request.form.get('name', '') + ' could not be listed.')
+  else:
+    page_cache.invalidate('venues')
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  return render_template('pages/home.html')
+
+@bp.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # answers the venue page's delete button with where to go next
+  venue = Venue.query.get_or_404(venue_id)
+  name = venue.name
+  deleted = False
+  try:
+    pages = venue_pages(venue.id)
+    remove_venue_shows(venue.id)
+    bury(Venue, select(Venue.id).where(Venue.id == venue.id))
+    db.session.delete(venue)
+    db.session.commit()
+    deleted = True
+    page_cache.invalidate(*pages)
+    flash('Venue ' + name + ' was successfully deleted!')
+  except SQLAlchemyError:
+    db.session.rollback()
+    flash('An error occured. Venue ' + name + ' could not be deleted.')
+  finally:
+    db.session.close()
+  # FINISHED: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return jsonify({"success": deleted, "redirect": url_for('main.index')}), 200 if deleted else 500
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  form = VenueForm()
+  venue = Venue.query.get_or_404(venue_id)
+  data={
+    "id": venue.id,
+    "name": venue.name,
+    "genres": venue.genres,
+    "city": venue.city,
+    "state": venue.state,
+    "phone": venue.phone,
+    "website_link": venue.website_link,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "image_link": venue.image_link,
+    "address": venue.address,
+    "timezone": venue.timezone
+  }
+  form.timezone.data = venue.timezone
+  # FINISHED: populate form with values from venue with ID <venue_id>
+  return render_template('forms/edit_venue.html', form=form, venue=data)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  venue = Venue.query.get_or_404(venue_id)
+  name = venue.name
+  try:
+    venue.name = request.form['name']
+    venue.city = request.form['city']
+    venue.state = request.form['state']
+    venue.phone = request.form['phone']
+    venue.genres = request.form.getlist('genres')
+    venue.facebook_link = request.form['facebook_link']
+    venue.website_link = request.form['website_link']
+    venue.seeking_description = request.form['seeking_description']
+    venue.image_link = request.form['image_link']
+    venue.seeking_talent = request.form.get('seeking_talent')
+    venue.address = request.form['address']
+    venue.timezone = request.form.get('timezone') or None
+    if (venue.seeking_talent == 'y'):
+      setattr(venue, 'seeking_talent', True)
+    else:
+      setattr(venue, 'seeking_talent', False)
+    touch_venue_artists(venue_id)
+    feed.update_venue(venue)
+    db.session.commit()
+  except (KeyError, SQLAlchemyError):
+    db.session.rollback()
+    flash('An error occured. Venue ' + name + ' could not be updated.')
+  else:
+    page_cache.invalidate(*venue_pages(venue_id))
+    flash('Venue ' + request.form['name'] + ' was successfully updated!')
+  # FINISHED: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))
@@ -0,0 +1,5 @@
+# Entry point for the WSGI server, e.g. `gunicorn wsgi:app`. Workers skip
+# Flask-Migrate, which only the `flask db` commands need.
+from app import create_app
+
+app = create_app(migrations=False)